@@ -1,14 +1,10 @@
 from datetime import date
-import psycopg2
-
-# Connect to PostgreSQL
-conn = psycopg2.connect(
-    dbname="StopRequestsDatabase",
-    user="postgres",
-    password="Ma_ria111",
-    host="localhost",
-    port="5432"
-)
+
+from database import engine
+
+# Connect to PostgreSQL (DATABASE_URL, see database.py)
+# للبيانات الكبيرة للاختبار استخدم: python -m bench.seed
+conn = engine.raw_connection()
 
 cur = conn.cursor()
 
@@ -0,0 +1,80 @@
+# Concurrency benchmark: fires parallel requests at a running server and
+# reports latency percentiles. Run it once against the old (sync session)
+# build and once against the async build to compare.
+#
+#   uvicorn main:app --port 8000
+#   python -m bench.concurrency --url http://localhost:8000 --concurrency 50 --requests 2000
+import argparse
+import asyncio
+import time
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/company_employees?search=1&limit=100",
+    "/suspended_employees?company_type=sales&limit=100",
+    "/companies_sales?limit=100",
+    "/suspended_beneficiaries?limit=100",
+    "/service_providers",
+]
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+async def run(url, paths, concurrency, total):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for i in counter:
+            path = paths[i % len(paths)]
+            start = time.perf_counter()
+            try:
+                r = await client.get(path)
+                if r.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel load latency benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--path", action="append", help="Path to hit (repeatable)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.path or DEFAULT_PATHS, args.concurrency, args.requests))
+    print(
+        f"{result['requests']} requests, {result['errors']} errors, {result['rps']:.1f} req/s | "
+        f"p50 {result['p50']:.1f} ms  p95 {result['p95']:.1f} ms  p99 {result['p99']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
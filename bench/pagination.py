@@ -0,0 +1,71 @@
+# Deep pagination benchmark: page 1 vs page N with skip/offset and with the
+# keyset cursor, against a running server.
+#
+#   python -m bench.pagination --seed 1000000      # once, fills an empty DB
+#   uvicorn main:app --port 8000
+#   python -m bench.pagination --url http://localhost:8000 --page 1000
+import argparse
+import statistics
+import time
+
+import httpx
+
+SEED_SQL = [
+    """INSERT INTO beneficiaries (name, national_id, phone, nationality)
+       SELECT 'Beneficiary ' || i, (2000000000 + i)::text, '05' || lpad(i::text, 8, '0'), 'SA'
+       FROM generate_series(1, :n) AS i""",
+    """INSERT INTO suspended_beneficiaries (beneficiary_id, suspended_at)
+       SELECT b.id, DATE '2020-01-01' + (b.id % 2000) FROM beneficiaries b""",
+    "ANALYZE beneficiaries",
+    "ANALYZE suspended_beneficiaries",
+]
+
+
+def seed(n):
+    from sqlalchemy import text
+    from database import engine
+
+    with engine.begin() as conn:
+        for sql in SEED_SQL:
+            conn.execute(text(sql), {"n": n} if ":n" in sql else {})
+
+
+def timed(client, path, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        r = client.get(path)
+        r.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offset vs cursor pagination benchmark")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/suspended_beneficiaries")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--page", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, metavar="ROWS", help="Seed ROWS beneficiaries/suspensions and exit")
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed)
+        return
+
+    skip = (args.page - 1) * args.limit
+    with httpx.Client(base_url=args.url, timeout=120) as client:
+        # the next_cursor of the row just before page N is the cursor for page N
+        cursor = client.get(f"{args.path}?skip={skip - 1}&limit=1").json()["next_cursor"]
+        first = timed(client, f"{args.path}?limit={args.limit}", args.repeat)
+        offset = timed(client, f"{args.path}?skip={skip}&limit={args.limit}", args.repeat)
+        keyset = timed(client, f"{args.path}?cursor={cursor}&limit={args.limit}", args.repeat)
+
+    print(f"page 1:                 {first:8.1f} ms")
+    print(f"page {args.page} (skip):      {offset:8.1f} ms")
+    print(f"page {args.page} (cursor):    {keyset:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
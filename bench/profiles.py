@@ -0,0 +1,127 @@
+# Scripted load profiles: which requests a benchmark run sends, and how often.
+#
+# Each profile is a list of (weight, request) pairs; a request function gets an
+# RNG and the Dataset (row counts of a database seeded by bench.seed) and
+# returns (method, path, json body or None). Keys are built the way bench.seed
+# builds them, so every lookup hits an existing row. "mixed" is all of the
+# read profiles plus a trickle of creates.
+import itertools
+import os
+import time
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import text
+
+from bench.seed import FIRST_DAY, LAST_NAMES
+
+LIMIT = 100
+
+
+class Dataset(NamedTuple):
+    companies: int
+    employees: int
+    beneficiaries: int
+    suspended_employees: int
+    suspended_beneficiaries: int
+    providers: int
+
+
+def load_dataset(engine):
+    tables = ["companies", "company_employees", "beneficiaries", "suspended_employees", "suspended_beneficiaries", "service_providers"]
+    with engine.connect() as conn:
+        return Dataset(*(conn.scalar(text(f"SELECT coalesce(max(id), 0) FROM {table}")) for table in tables))
+
+
+def employee_nid(rng, ds):
+    return f"1{rng.randint(1, ds.employees):09d}"
+
+
+def beneficiary_nid(rng, ds):
+    return f"2{rng.randint(1, ds.beneficiaries):09d}"
+
+
+def unified_number(rng, ds):
+    return f"7{rng.randint(1, ds.companies):09d}"
+
+
+def deep_skip(rng, rows):
+    # offsets spread over the whole table, so the tail pages are measured too
+    return rng.randrange(max(1, rows - LIMIT))
+
+
+# --- بحث ---
+SEARCH = [
+    (3, lambda rng, ds: ("GET", f"/company_employees?search={employee_nid(rng, ds)[:8]}&limit={LIMIT}", None)),
+    (2, lambda rng, ds: ("GET", f"/company_employees?search={rng.choice(LAST_NAMES)}&limit={LIMIT}&total=estimate", None)),
+    (1, lambda rng, ds: ("GET", f"/company_employees?company_id={rng.randint(1, ds.companies)}&limit={LIMIT}", None)),
+    (2, lambda rng, ds: ("GET", f"/suspended_employees?search={employee_nid(rng, ds)[:7]}&company_type={rng.choice(['sales', 'installation'])}&limit={LIMIT}", None)),
+    (1, lambda rng, ds: ("GET", f"/companies_sales?search={rng.randint(1, ds.companies)}&limit={LIMIT}", None)),
+    (1, lambda rng, ds: ("GET", f"/suspended_beneficiaries?search={beneficiary_nid(rng, ds)[:7]}&limit={LIMIT}", None)),
+    (1, lambda rng, ds: ("GET", f"/suspended_employees?since={new_day(rng)}&limit={LIMIT}&total=none", None)),
+]
+
+# --- صفحات عميقة ---
+DEEP_PAGINATION = [
+    (3, lambda rng, ds: ("GET", f"/company_employees?skip={deep_skip(rng, ds.employees)}&limit={LIMIT}&total=none", None)),
+    (1, lambda rng, ds: ("GET", f"/company_employees?skip={deep_skip(rng, ds.employees)}&limit={LIMIT}", None)),
+    (2, lambda rng, ds: ("GET", f"/beneficiaries?skip={deep_skip(rng, ds.beneficiaries)}&limit={LIMIT}", None)),
+    (2, lambda rng, ds: ("GET", f"/suspended_employees?skip={deep_skip(rng, ds.suspended_employees)}&limit={LIMIT}&total=none", None)),
+    (1, lambda rng, ds: ("GET", f"/suspended_beneficiaries?skip={deep_skip(rng, ds.suspended_beneficiaries)}&limit={LIMIT}&total=none", None)),
+    (1, lambda rng, ds: ("GET", f"/companies?type=sales&skip={deep_skip(rng, ds.companies // 2)}&limit={LIMIT}", None)),
+    (2, lambda rng, ds: ("GET", f"/company_employees?sort={rng.choice(['name', '-name', 'company'])}&skip={deep_skip(rng, ds.employees)}&limit={LIMIT}&total=none", None)),
+    (1, lambda rng, ds: ("GET", f"/suspended_employees?sort=-suspended_at&skip={deep_skip(rng, ds.suspended_employees)}&limit={LIMIT}&total=none", None)),
+    (1, lambda rng, ds: ("GET", f"/beneficiaries?sort=name&skip={deep_skip(rng, ds.beneficiaries)}&limit={LIMIT}", None)),
+]
+
+# --- جلب بالمفتاح ---
+DETAIL = [
+    (3, lambda rng, ds: ("GET", f"/company_employees/{rng.randint(1, ds.employees)}", None)),
+    (3, lambda rng, ds: ("GET", f"/beneficiaries/{beneficiary_nid(rng, ds)}", None)),
+    (1, lambda rng, ds: ("GET", f"/companies/{unified_number(rng, ds)}", None)),
+    (1, lambda rng, ds: ("GET", f"/suspended_beneficiaries/{rng.randint(1, ds.suspended_beneficiaries)}", None)),
+    (3, lambda rng, ds: ("GET", f"/suspensions/check?national_id={rng.choice([employee_nid, beneficiary_nid])(rng, ds)}", None)),
+    (1, lambda rng, ds: ("POST", "/beneficiaries/lookup", {"keys": [beneficiary_nid(rng, ds) for _ in range(LIMIT)]})),
+    (1, lambda rng, ds: ("POST", "/company_employees/lookup?by=id", {"keys": [rng.randint(1, ds.employees) for _ in range(LIMIT)]})),
+    (1, lambda rng, ds: ("GET", "/stats", None)),
+]
+
+# --- إضافة ---
+# new national_ids must not collide with seeded ones (1…/2… prefixes) or with earlier runs
+_new_ids = itertools.count(int(time.time()) % 10**6 * 1000 + os.getpid() % 1000)
+
+
+def new_beneficiary(rng, ds):
+    return "POST", "/beneficiaries", {
+        "name": "مستفيد جديد", "national_id": f"9{next(_new_ids):012d}",
+        "phone": f"05{rng.randrange(10**8):08d}", "nationality": "SA",
+    }
+
+
+def new_day(rng):
+    return (FIRST_DAY + timedelta(days=rng.randrange((date.today() - FIRST_DAY).days))).isoformat()
+
+
+CREATE = [
+    (2, new_beneficiary),
+    (2, lambda rng, ds: ("POST", "/suspended_beneficiaries", {"beneficiary_id": rng.randint(1, ds.beneficiaries), "suspended_at": new_day(rng)})),
+    (1, lambda rng, ds: ("POST", "/suspended_employees", {"employee_id": rng.randint(1, ds.employees), "suspended_at": new_day(rng)})),
+    (1, lambda rng, ds: ("POST", "/employee_service_provider", {
+        "employee_id": rng.randint(1, ds.employees), "provider_id": rng.randint(1, ds.providers), "assigned_at": new_day(rng),
+    })),
+]
+
+PROFILES = {
+    "search": SEARCH,
+    "deep_pagination": DEEP_PAGINATION,
+    "detail": DETAIL,
+    "create": CREATE,
+    "mixed": SEARCH + DEEP_PAGINATION + DETAIL + [(weight / 4, request) for weight, request in CREATE],
+}
+
+
+def requests(profile, rng, ds):
+    # endless stream of (method, path, body) drawn by weight
+    weights, makers = zip(*PROFILES[profile])
+    while True:
+        yield rng.choices(makers, weights)[0](rng, ds)
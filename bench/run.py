@@ -0,0 +1,176 @@
+# Load test runner: drives the profiles in bench/profiles.py against a server
+# and reports throughput and p50/p95/p99 latency per profile. With --compare it
+# checks out each git revision into a temporary worktree, starts uvicorn from
+# it, runs the same profiles (same seeds, so the same request sequence) and
+# prints both revisions side by side.
+#
+#   python -m bench.seed --employees 2000000 --beneficiaries 2000000 --reset
+#   python -m bench.run --url http://localhost:8000 --profile search detail --duration 30
+#   python -m bench.run --compare main HEAD --duration 60 --concurrency 32 --json results.json
+#
+# Both revisions share the database, so it has to be migrated for the newer one
+# (--migrate runs `alembic upgrade head` from each worktree). The create profile
+# adds rows, put it last when comparing read latencies.
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench.concurrency import percentile
+from bench.profiles import PROFILES, load_dataset, requests
+from database import engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def run_profile(url, profile, ds, concurrency, duration, warmup, seed):
+    latencies = []
+    errors = client_errors = 0
+
+    async def worker(client, number, until, record):
+        nonlocal errors, client_errors
+        stream = requests(profile, random.Random(f"{seed}:{profile}:{number}"), ds)
+        while time.perf_counter() < until:
+            method, path, body = next(stream)
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, path, json=body)
+                status = r.status_code
+            except httpx.HTTPError:
+                status = 599
+            if record:
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status >= 500:
+                    errors += 1
+                elif status >= 400:
+                    client_errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        if warmup:
+            until = time.perf_counter() + warmup
+            await asyncio.gather(*(worker(client, -n - 1, until, False) for n in range(concurrency)))
+        started = time.perf_counter()
+        until = started + duration
+        await asyncio.gather(*(worker(client, n, until, True) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "4xx": client_errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def run_all(url, args, ds):
+    results = {}
+    for profile in args.profile:
+        results[profile] = asyncio.run(run_profile(url, profile, ds, args.concurrency, args.duration, args.warmup, args.seed))
+        print(f"  {profile:<16}{format_result(results[profile])}", flush=True)
+    return results
+
+
+def format_result(result):
+    return (
+        f"{result['requests']:>8} req {result['errors']:>5} err {result['4xx']:>5} 4xx {result['rps']:>9.1f} req/s | "
+        f"p50 {result['p50']:7.1f} ms  p95 {result['p95']:7.1f} ms  p99 {result['p99']:7.1f} ms"
+    )
+
+
+def wait_until_up(url, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            if httpx.get(url + "/", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server at {url} did not come up in {timeout}s")
+
+
+@contextlib.contextmanager
+def serve(rev, args):
+    # a worktree per revision, so the current checkout is never touched
+    worktree = tempfile.mkdtemp(prefix="bench-")
+    subprocess.run(["git", "worktree", "add", "--detach", worktree, rev], cwd=ROOT, check=True, capture_output=True)
+    server = None
+    try:
+        if args.migrate:
+            subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=worktree, check=True)
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+            cwd=worktree,
+        )
+        url = f"http://127.0.0.1:{args.port}"
+        wait_until_up(url, server)
+        yield url
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=ROOT, check=False, capture_output=True)
+
+
+def print_comparison(revs, results):
+    a, b = revs
+    print(f"\n{'profile':<16}{'metric':<8}{a[:12]:>14}{b[:12]:>14}{'change':>9}")
+    for profile in results[a]:
+        for metric in ("rps", "p50", "p95", "p99"):
+            old, new = results[a][profile][metric], results[b][profile][metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+            print(f"{profile:<16}{metric:<8}{old:>14.1f}{new:>14.1f}{change:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run load profiles and report throughput and latency percentiles")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--profile", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="seconds measured per profile")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run and discarded before each profile")
+    parser.add_argument("--seed", default="cst")
+    parser.add_argument("--compare", nargs=2, metavar="REV", help="benchmark two git revisions instead of --url")
+    parser.add_argument("--port", type=int, default=8765, help="port for --compare servers")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --compare servers")
+    parser.add_argument("--migrate", action="store_true", help="run alembic upgrade head from each revision first")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    ds = load_dataset(engine)
+    print(f"dataset: {ds}")
+
+    if args.compare:
+        results = {}
+        for rev in args.compare:
+            print(f"{rev}:")
+            with serve(rev, args) as url:
+                results[rev] = run_all(url, args, ds)
+        print_comparison(args.compare, results)
+    else:
+        results = run_all(args.url, args, ds)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"dataset": ds._asdict(), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# Deterministic data generator for every table in models.py, loaded with COPY.
+# The same --seed and sizes always produce the same rows (ids included), so
+# runs on different machines or revisions see identical data.
+#
+#   alembic upgrade head
+#   python -m bench.seed --employees 2000000 --beneficiaries 2000000 --reset
+#
+# Defaults scale from --employees: one company per 100 employees, one service
+# provider per 10 companies, 5% of employees/beneficiaries suspended, 30% of
+# employees assigned to one or two providers.
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from database import engine
+from partitions import PARTITIONED, maintain
+
+FIRST_NAMES = ["محمد", "أحمد", "عبدالله", "فهد", "سارة", "نورة", "مريم", "خالد", "ريم", "سلطان", "Omar", "Lina", "Yousef", "Hana"]
+LAST_NAMES = ["العتيبي", "القحطاني", "الشهري", "الدوسري", "الحربي", "الغامدي", "الزهراني", "Alrasheed", "Alharbi", "Almutairi"]
+NATIONALITIES = ["SA", "SA", "SA", "SA", "EG", "IN", "PK", "YE", "JO", "PH"]
+FIRST_DAY = date(2021, 1, 1)
+DAYS = 4 * 365
+
+TABLES = [
+    "employee_service_provider", "suspended_employees", "suspended_beneficiaries",
+    "service_providers", "company_employees", "beneficiaries", "companies",
+]
+
+
+class RowStream:
+    # file-like object COPY reads from, rows are generated as it goes
+    def __init__(self, rows):
+        self._lines = ("\t".join(map(str, row)) + "\n" for row in rows)
+        self._buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    readline = read
+
+
+def person_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def day(rng):
+    return FIRST_DAY + timedelta(days=rng.randrange(DAYS))
+
+
+def companies(rng, n):
+    for i in range(1, n + 1):
+        yield i, f"شركة {i}", f"CR{i:08d}", f"7{i:09d}", rng.choice(["sales", "installation"])
+
+
+def company_employees(rng, n, companies):
+    for i in range(1, n + 1):
+        yield i, person_name(rng), f"1{i:09d}", f"J{i:07d}", rng.choice(NATIONALITIES), f"05{rng.randrange(10**8):08d}", rng.randint(1, companies)
+
+
+def beneficiaries(rng, n):
+    for i in range(1, n + 1):
+        yield i, person_name(rng), f"2{i:09d}", f"05{rng.randrange(10**8):08d}", rng.choice(NATIONALITIES)
+
+
+def suspensions(rng, n, ratio):
+    ids = 0
+    for person_id in range(1, n + 1):
+        if rng.random() < ratio:
+            ids += 1
+            yield ids, person_id, day(rng)
+
+
+def service_providers(rng, n, companies):
+    for i in range(1, n + 1):
+        yield i, f"مزود {i}", f"SP{i:04d}", rng.randint(1, companies)
+
+
+def assignments(rng, employees, providers, ratio):
+    ids = 0
+    for employee_id in range(1, employees + 1):
+        if rng.random() < ratio:
+            for provider_id in rng.sample(range(1, providers + 1), k=min(providers, rng.choice([1, 1, 2]))):
+                ids += 1
+                yield ids, employee_id, provider_id, day(rng)
+
+
+def plan(args):
+    # (table, columns, row generator); each table gets its own RNG stream so sizes don't shift other tables
+    def rng(table):
+        return random.Random(f"{args.seed}:{table}")
+
+    n_companies = args.companies or max(1, args.employees // 100)
+    n_providers = args.providers or max(1, n_companies // 10)
+    return [
+        ("companies", "id, name, commercial_number, unified_number, type",
+         companies(rng("companies"), n_companies)),
+        ("company_employees", "id, name, national_id, job_number, nationality, phone, company_id",
+         company_employees(rng("company_employees"), args.employees, n_companies)),
+        ("beneficiaries", "id, name, national_id, phone, nationality",
+         beneficiaries(rng("beneficiaries"), args.beneficiaries)),
+        ("suspended_employees", "id, employee_id, suspended_at",
+         suspensions(rng("suspended_employees"), args.employees, args.suspended)),
+        ("suspended_beneficiaries", "id, beneficiary_id, suspended_at",
+         suspensions(rng("suspended_beneficiaries"), args.beneficiaries, args.suspended)),
+        ("service_providers", "id, name, code, company_id",
+         service_providers(rng("service_providers"), n_providers, n_companies)),
+        ("employee_service_provider", "id, employee_id, provider_id, assigned_at",
+         assignments(rng("employee_service_provider"), args.employees, n_providers, args.assigned)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the database with deterministic benchmark data")
+    parser.add_argument("--employees", type=int, default=1_000_000)
+    parser.add_argument("--beneficiaries", type=int, default=1_000_000)
+    parser.add_argument("--companies", type=int, help="default: employees / 100")
+    parser.add_argument("--providers", type=int, help="default: companies / 10")
+    parser.add_argument("--suspended", type=float, default=0.05, help="share of employees/beneficiaries suspended")
+    parser.add_argument("--assigned", type=float, default=0.3, help="share of employees assigned to providers")
+    parser.add_argument("--seed", default="cst")
+    parser.add_argument("--reset", action="store_true", help="TRUNCATE the tables first (they must be empty otherwise)")
+    args = parser.parse_args()
+
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if args.reset:
+            cursor.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+        for table, columns, rows in plan(args):
+            started = time.perf_counter()
+            cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", RowStream(rows))
+            copied = cursor.rowcount
+            # ids were given explicitly, move the sequence past them
+            cursor.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), coalesce(max(id), 0) + 1, false) FROM {table}")
+            print(f"{table:<28}{copied:>10} {time.perf_counter() - started:8.1f}s", flush=True)
+        connection.commit()
+    finally:
+        connection.close()
+
+    # rows dated where no monthly partition exists yet went to the DEFAULT ones (see partitions.py)
+    for table in PARTITIONED:
+        with engine.begin() as conn:
+            maintain(conn, table)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("ANALYZE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# Serialization microbenchmark: rows/sec for one list page, default path
+# (ORM entities -> response_model validation -> JSON, as FastAPI does it) vs
+# the fast path (column tuples -> generated dicts -> orjson, serialization.py).
+# No database or server is involved; DATABASE_URL only has to be set so the
+# models import.
+#
+#   python -m bench.serialization --sizes 100 1000 10000
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+import models
+import schemas
+from serialization import RowSerializer
+
+
+def employees(n):
+    company = models.Company(id=1, name="شركة 1", commercial_number="C1", unified_number="U1", type=models.CompanyTypeEnum.sales)
+    return [
+        models.CompanyEmployee(
+            id=i, name=f"موظف {i}", national_id=str(1000000000 + i), job_number=f"J{i}",
+            nationality="SA", phone=f"05{i:08d}", company_id=1, company=company,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def suspended_employees(n):
+    return [models.SuspendedEmployee(id=e.id, suspended_at=date(2024, 1, 1), employee=e) for e in employees(n)]
+
+
+def as_row(obj, columns):
+    # the tuple the fast-path query would return for this entity
+    row = []
+    for column in columns:
+        target = obj
+        if column.class_ is not type(obj):
+            target = obj.employee if column.class_ is models.CompanyEmployee else obj.employee.company
+        row.append(getattr(target, column.key))
+    return tuple(row)
+
+
+CASES = [
+    ("company_employees", models.CompanyEmployee, schemas.CompanyEmployeeOut, schemas.EmployeeListResponse, employees),
+    ("suspended_employees", models.SuspendedEmployee, schemas.SuspendedEmployeeOut, schemas.SuspendedEmployeeListResponse, suspended_employees),
+]
+
+
+async def default_path(field, entities):
+    page = {"data": entities, "total": len(entities), "has_more": False, "next_cursor": None}
+    content = await serialize_response(field=field, response_content=page, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def run(sizes, repeat):
+    print(f"{'case':<22}{'rows':>7}{'default rows/s':>17}{'fast rows/s':>15}{'speedup':>9}")
+    for name, model, schema, response, make in CASES:
+        field = create_model_field(name=f"Response_{name}", type_=response, mode="serialization")
+        rows = RowSerializer(model, schema)
+        for size in sizes:
+            entities = make(size)
+            page = {"data": [as_row(obj, rows.columns) for obj in entities], "total": size, "has_more": False, "next_cursor": None}
+            assert rows.dumps(page) == await default_path(field, entities), "fast path output differs"
+
+            async def fast():
+                rows.dumps(page)
+
+            slow_s = await timed(lambda: default_path(field, entities), repeat)
+            fast_s = await timed(fast, repeat)
+            print(f"{name:<22}{size:>7}{size / slow_s:>17,.0f}{size / fast_s:>15,.0f}{slow_s / fast_s:>8.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Default vs fast list serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# Bulk ingestion for the /…/bulk endpoints.
+#
+# The body is a JSON array, NDJSON (one object per line) or CSV with a header
+# row, picked by Content-Type. NDJSON and CSV are parsed as they stream in.
+# Items are validated against the entity's *Create schema and written in
+# batches, one transaction per batch:
+#   insert - multi-row INSERT ... RETURNING id (ids come back in input order)
+#   copy   - Postgres COPY through asyncpg, fastest, no ids returned
+# When a batch hits a database error (FK, unique, ...) it is retried row by
+# row inside savepoints so only the offending items are rejected. Every
+# rejected item is reported with its index in the input.
+import codecs
+import collections
+import csv
+import json
+import re
+
+import asyncpg
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+
+from schemas import BulkMethod
+
+BATCH_SIZE = 5000
+
+# COPY goes straight to asyncpg, so its errors are not wrapped in DBAPIError
+DB_ERRORS = (DBAPIError, asyncpg.PostgresError)
+
+
+async def _lines(request: Request):
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+class _LineFeed:
+    # the input of one csv.reader, refilled as lines arrive; a quoted field may span lines
+    def __init__(self):
+        self.lines = collections.deque()
+        self.quotes = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+    def add(self, line):
+        self.lines.append(line + "\n")  # _lines() drops it; inside quotes it is part of the value
+        self.quotes += line.count('"')
+
+    def complete(self):
+        # an even number of quotes so far: the buffered lines end on a record boundary
+        return self.quotes % 2 == 0
+
+
+async def _items(request: Request):
+    # yields (index, dict) or (index, error message) per input item
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    if content_type in ("application/x-ndjson", "application/jsonl", "application/ndjson"):
+        index = 0
+        async for line in _lines(request):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line)
+            except ValueError as e:
+                yield index, f"invalid JSON: {e}"
+            index += 1
+    elif content_type == "text/csv":
+        feed = _LineFeed()
+        reader = csv.reader(feed)
+        header = None
+        index = 0
+        async for line in _lines(request):
+            if not feed.lines and not line.strip():
+                continue
+            feed.add(line)
+            if not feed.complete():
+                continue
+            row = next(reader)
+            if header is None:
+                header = [name.strip() for name in row]
+                continue
+            if len(row) != len(header):
+                yield index, f"expected {len(header)} columns, got {len(row)}"
+            else:
+                yield index, dict(zip(header, row))
+            index += 1
+        if feed.lines:
+            yield index, "unterminated quoted field"
+    elif content_type == "application/json":
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array")
+        for index, item in enumerate(data):
+            yield index, item
+    else:
+        raise HTTPException(status_code=415, detail="Use application/json, application/x-ndjson or text/csv")
+
+
+def _validation_message(e: ValidationError):
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'item'}: {err['msg']}" for err in e.errors())
+
+
+def _db_message(e):
+    message = str(getattr(e, "orig", None) or e)
+    return " ".join(re.sub(r"^<class '[\w.]+'>: ", "", message).split())
+
+
+async def _copy(db, model, rows):
+    columns = list(rows[0])
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        model.__tablename__, records=[tuple(row[c] for c in columns) for row in rows], columns=columns
+    )
+
+
+async def _write_batch(db, model, batch, method, result):
+    indexes = [index for index, _ in batch]
+    rows = [row for _, row in batch]
+    statement = insert(model).returning(model.id, sort_by_parameter_order=True)
+    try:
+        async with db.begin_nested():
+            if method == BulkMethod.copy:
+                await _copy(db, model, rows)
+                ids = []
+            else:
+                ids = (await db.scalars(statement, rows)).all()
+        result["ids"].extend(ids)
+        result["inserted"] += len(rows)
+    except DB_ERRORS:
+        # find the rows that broke the batch
+        for index, row in zip(indexes, rows):
+            try:
+                async with db.begin_nested():
+                    new_id = await db.scalar(statement, row)
+                if method != BulkMethod.copy:
+                    result["ids"].append(new_id)
+                result["inserted"] += 1
+            except DB_ERRORS as e:
+                result["errors"].append({"index": index, "error": _db_message(e)})
+    await db.commit()
+
+
+async def bulk_load(db, request: Request, model, schema, method: BulkMethod = BulkMethod.insert):
+    result = {"inserted": 0, "failed": 0, "ids": [], "errors": []}
+    batch = []
+    async for index, raw in _items(request):
+        if isinstance(raw, str):
+            result["errors"].append({"index": index, "error": raw})
+            continue
+        try:
+            batch.append((index, schema.model_validate(raw).model_dump()))
+        except ValidationError as e:
+            result["errors"].append({"index": index, "error": _validation_message(e)})
+        if len(batch) >= BATCH_SIZE:
+            await _write_batch(db, model, batch, method, result)
+            batch = []
+    if batch:
+        await _write_batch(db, model, batch, method, result)
+    result["failed"] = len(result["errors"])
+    result["errors"].sort(key=lambda e: e["index"])
+    return result
@@ -0,0 +1,110 @@
+# Read-through cache for reference data (service providers, companies).
+#
+# Entries are stored as ready-to-send JSON bytes under
+# "<namespace>:<version>:<key>". On routes with an ETag the version is the
+# table versions conditional() read for the request, so a body is only reused
+# for exactly the data its ETag names, whoever wrote last (another worker, a
+# script, plain SQL). Without them (no change tracking, e.g. SQLite) it is a
+# namespace counter that writes bump, which orphans every old entry at once
+# without scanning keys. Orphans age out via TTL / LRU. The backend only needs get / set(ex=) / incr, so the default
+# in-process LRU and any Redis client (redis.asyncio or a local stand-in)
+# are interchangeable. Pick one with CACHE_URL (unset = in-process).
+#
+# The in-process backend is per worker. With table versions that is only a
+# matter of hit ratio; with the counter a write only invalidates the worker
+# that handled it and the others catch up within the TTL.
+import os
+import time
+from collections import OrderedDict, defaultdict
+
+from fastapi import Response
+
+CACHE_URL = os.getenv("CACHE_URL")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+
+
+class MemoryBackend:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._counters = {}            # version counters are never evicted
+
+    async def get(self, key):
+        if key in self._counters:
+            return self._counters[key]
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ex=None):
+        self._entries[key] = (time.monotonic() + ex if ex else None, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def incr(self, key):
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+def redis_backend(url):
+    try:
+        import redis.asyncio as redis
+    except ImportError:
+        raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed")
+    return redis.from_url(url)
+
+
+class Cache:
+    def __init__(self, backend, ttl=CACHE_TTL_SECONDS):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    async def _version(self, namespace):
+        version = await self.backend.get(f"{namespace}:version")
+        return int(version or 0)
+
+    async def get_or_load(self, namespace, key, load, versions=None):
+        # load() is awaited on a miss and must return JSON bytes
+        if versions is not None:
+            version = ",".join(f"{table}={value}" for table, value in sorted(versions.items()))
+        else:
+            version = await self._version(namespace)
+        full_key = f"{namespace}:{version}:{key}"
+        body = await self.backend.get(full_key)
+        if body is not None:
+            self.hits[namespace] += 1
+            return body
+        self.misses[namespace] += 1
+        body = await load()
+        await self.backend.set(full_key, body, ex=self.ttl)
+        return body
+
+    async def json_response(self, namespace, key, load, versions=None):
+        return Response(content=await self.get_or_load(namespace, key, load, versions), media_type="application/json")
+
+    async def invalidate(self, namespace):
+        await self.backend.incr(f"{namespace}:version")
+
+    def stats(self):
+        namespaces = sorted(set(self.hits) | set(self.misses))
+        return {
+            ns: {
+                "hits": self.hits[ns],
+                "misses": self.misses[ns],
+                "hit_ratio": round(self.hits[ns] / ((self.hits[ns] + self.misses[ns]) or 1), 4),
+            }
+            for ns in namespaces
+        }
+
+
+cache = Cache(redis_backend(CACHE_URL) if CACHE_URL else MemoryBackend())
@@ -0,0 +1,84 @@
+# HTTP conditional requests (ETag / If-None-Match) for the GET endpoints.
+#
+# The ETag of a response is a hash of the route, its query string and the
+# change versions of the tables the route reads (table_versions, bumped by
+# triggers on every write, see models.py). Checking it costs one primary-key
+# lookup, so a matching If-None-Match gets a 304 before the page query runs
+# or anything is serialized.
+#
+# Usage: dependencies=[Depends(conditional("companies", cache_control="max-age=30"))]
+import hashlib
+
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import models
+from database import get_db
+
+DEFAULT_CACHE_CONTROL = "no-cache"  # clients may store the response but must revalidate
+
+
+async def table_versions(db: AsyncSession, tables):
+    rows = await db.execute(
+        select(models.TableVersion.table_name, models.TableVersion.version)
+        .filter(models.TableVersion.table_name.in_(tables))
+    )
+    return dict(rows.all())
+
+
+def make_etag(request: Request, versions: dict) -> str:
+    parts = [request.url.path, str(sorted(request.query_params.multi_items()))]
+    parts += [f"{table}={version}" for table, version in sorted(versions.items())]
+    return 'W/"' + hashlib.blake2b("|".join(parts).encode(), digest_size=12).hexdigest() + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # weak comparison: W/"x" and "x" are the same tag
+    return "*" in tags or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in tags)
+
+
+def conditional(*tables, cache_control: str = DEFAULT_CACHE_CONTROL):
+    async def check(request: Request, db: AsyncSession = Depends(get_db)):
+        if db.bind.dialect.name != "postgresql":
+            return  # no change-tracking triggers, so no safe ETag
+        versions = await table_versions(db, tables)
+        versions = {table: versions.get(table, 0) for table in tables}
+        request.state.table_versions = versions
+        etag = make_etag(request, versions)
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        request.scope["conditional_headers"] = headers
+
+    return check
+
+
+def request_versions(request: Request):
+    # the table versions the request's ETag was built from (None without change tracking);
+    # cache.py keys cached bodies on them so a body always matches its ETag
+    return getattr(request.state, "table_versions", None)
+
+
+class ConditionalHeadersMiddleware:
+    # adds the ETag / Cache-Control computed by conditional() to the response,
+    # including endpoints that return a ready Response (e.g. cache hits)
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = scope.get("conditional_headers")
+                if headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (name.lower().encode(), value.encode()) for name, value in headers.items()
+                    ]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
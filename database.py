@@ -1,12 +1,262 @@
+import asyncio
 import os
+import time
+from uuid import uuid4
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+import metrics
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if DATABASE_URL is None:
     raise ValueError("DATABASE_URL not found. تأكدي إنه معرف في بيئة التشغيل")
 
-engine = create_engine(DATABASE_URL)
+
+def env_flag(name, default=False):
+    value = os.getenv(name)
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Connection pool settings (per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 to disable
+DB_POOL_PRE_PING = env_flag("DB_POOL_PRE_PING", True)         # drop connections killed by a Postgres restart
+# PgBouncer (transaction pooling): no app-side pool and no server-side prepared statements
+DB_PGBOUNCER = env_flag("DB_PGBOUNCER")
+
+# Read replicas (comma-separated URLs): GET requests and batch lookups read from them, writes use DATABASE_URL
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))  # reads stay on the primary after a client writes
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "10"))     # a replica that failed to connect is skipped this long
+REPLICA_CONNECT_TIMEOUT = float(os.getenv("REPLICA_CONNECT_TIMEOUT", "2"))
+
+
+def to_async_url(url):
+    # نفس قاعدة البيانات لكن بدرايفر async (asyncpg بدل psycopg2)
+    url = make_url(url)
+    if url.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        return url.set(drivername="postgresql+asyncpg")
+    if url.drivername == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+class PoolStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.waits = 0          # checkouts that found the pool exhausted
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # records how long requests wait for a connection
+    def _do_get(self):
+        exhausted = self._max_overflow > -1 and self.checkedout() >= self.size() + self._max_overflow
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            pool_stats.timeouts += exhausted
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            pool_stats.checkouts += 1
+            if exhausted:
+                pool_stats.waits += 1
+                pool_stats.wait_seconds += elapsed
+                pool_stats.max_wait_seconds = max(pool_stats.max_wait_seconds, elapsed)
+
+
+def pool_options(async_driver=False):
+    if DB_PGBOUNCER:
+        options = {"poolclass": NullPool}
+        if async_driver:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        return options
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if async_driver:
+        options["poolclass"] = TimedQueuePool
+    return options
+
+
+# Sync engine: used by scripts and schema creation only
+engine = create_engine(DATABASE_URL, **pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine: used by every API endpoint so queries don't block the event loop
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(async_driver=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# per-statement timing and slow query log (see metrics.py)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+
+
+# === Read replicas ===
+# GET/HEAD requests get a session on a replica (round robin), and so do the
+# read-only POSTs (batch lookups) that take get_read_db; every other method the
+# primary, through get_db, which marks the request as a write. A client whose
+# write succeeded gets a short-lived cookie (ReadYourWritesMiddleware) and reads
+# from the primary until it expires, so it sees its own write whatever the
+# replication lag. The replica connection is
+# opened before the session is handed out; a replica that can't be reached in
+# REPLICA_CONNECT_TIMEOUT is skipped for REPLICA_RETRY_SECONDS and the read goes
+# to the next one, or to the primary when none is left. Works with any URL
+# to_async_url() understands, so two SQLite files can stand in for a primary and
+# a replica when testing.
+READ_METHODS = ("GET", "HEAD")
+PRIMARY_COOKIE = "db_primary"
+
+
+class Replica:
+    def __init__(self, url):
+        options = pool_options(async_driver=True)
+        if options.get("poolclass") is TimedQueuePool:
+            options["poolclass"] = AsyncAdaptedQueuePool  # pool_stats / pool_status() describe the primary
+        self.engine = create_async_engine(to_async_url(url), **options)
+        self.sessions = async_sessionmaker(self.engine, autoflush=False, expire_on_commit=False)
+        self.down_until = 0.0
+        metrics.instrument_engine(self.engine.sync_engine)
+
+
+replicas = [Replica(url) for url in DATABASE_REPLICA_URLS]
+_next_replica = 0
+
+
+async def _replica_session():
+    # a connected session on a reachable replica, or None
+    global _next_replica
+    start, _next_replica = _next_replica, _next_replica + 1
+    for i in range(len(replicas)):
+        replica = replicas[(start + i) % len(replicas)]
+        if replica.down_until > time.monotonic():
+            continue
+        session = replica.sessions()
+        try:
+            await asyncio.wait_for(session.connection(), REPLICA_CONNECT_TIMEOUT)
+            return session
+        except (DBAPIError, OSError, asyncio.TimeoutError):
+            await session.close()
+            replica.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+    return None
+
+
+async def read_session():
+    # for reads outside a request (e.g. streaming exports): a replica if one is up
+    return (await _replica_session() if replicas else None) or AsyncSessionLocal()
+
+
+class ReadYourWritesMiddleware:
+    # successful writes pin the client's reads to the primary for READ_YOUR_WRITES_SECONDS;
+    # a write is a request get_db handed the primary to (request.state.db_write)
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas or scope["method"] in READ_METHODS:
+            return await self.app(scope, receive, send)
+
+        async def send_with_cookie(message):
+            wrote = scope.get("state", {}).get("db_write", False)
+            if message["type"] == "http.response.start" and message["status"] < 400 and wrote:
+                cookie = f"{PRIMARY_COOKIE}=1; Max-Age={READ_YOUR_WRITES_SECONDS}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
 Base = declarative_base()
+
+
+def pool_status():
+    pool = async_engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, TimedQueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "checkouts": pool_stats.checkouts,
+            "waits": pool_stats.waits,
+            "wait_seconds_total": round(pool_stats.wait_seconds, 6),
+            "wait_seconds_max": round(pool_stats.max_wait_seconds, 6),
+            "timeouts": pool_stats.timeouts,
+        })
+    return status
+
+
+_last_ping = None  # "ok" / "unreachable": the outcome of the latest ping()
+
+
+async def ping(timeout=5):
+    # health checks: a round trip through the pool, bounded so a hung DB can't hang the probe
+    global _last_ping
+    async def select_one():
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    try:
+        await asyncio.wait_for(select_one(), timeout)
+    except Exception:
+        _last_ping = "unreachable"
+        raise
+    _last_ping = "ok"
+
+
+def last_ping():
+    # what the latest ping() found, without touching the database ("unknown" before the first one)
+    return _last_ping or "unknown"
+
+
+async def dispose():
+    # graceful shutdown: close pooled connections instead of leaving them to the server to time out
+    await async_engine.dispose()
+    engine.dispose()
+    for replica in replicas:
+        await replica.engine.dispose()
+
+
+# Dependency: Database session (async, so queries don't block the event loop);
+# GET/HEAD go to a replica when configured, see above
+async def get_db(request: Request):
+    db = None
+    if request.method not in READ_METHODS:
+        request.state.db_write = True
+    elif replicas and PRIMARY_COOKIE not in request.cookies:
+        db = await _replica_session()
+    async with db or AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for routes that only read whatever their method (POST /…/lookup): a replica when configured
+async def get_read_db(request: Request):
+    db = None
+    if replicas and PRIMARY_COOKIE not in request.cookies:
+        db = await _replica_session()
+    async with db or AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,69 @@
+# Streaming export for the /…/export endpoints.
+#
+# Rows are read through a server-side cursor (AsyncSession.stream_scalars with
+# yield_per), serialized one partition at a time and written straight into a
+# StreamingResponse, so memory stays flat no matter how many rows match. The
+# export opens its own session: the request's get_db session is closed before
+# a streaming body is sent. It reads from a replica when they are configured
+# (see database.py).
+import csv
+import io
+import json
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from database import read_session
+from loading import nested_schema
+from schemas import ExportFormat
+
+EXPORT_BATCH = 1000
+
+
+def csv_columns(schema, prefix=""):
+    # nested schemas are flattened into dotted columns: employee.company.name
+    columns = []
+    for name, field in schema.model_fields.items():
+        nested = nested_schema(field.annotation)
+        if nested is not None:
+            columns += csv_columns(nested, f"{prefix}{name}.")
+        else:
+            columns.append(f"{prefix}{name}")
+    return columns
+
+
+def _flatten(row: dict, prefix=""):
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+async def _stream(query, schema, format: ExportFormat):
+    columns = csv_columns(schema)
+    if format == ExportFormat.csv:
+        yield ",".join(columns) + "\n"
+    async with await read_session() as db:
+        result = await db.stream_scalars(query.execution_options(yield_per=EXPORT_BATCH))
+        async for partition in result.partitions():
+            rows = [schema.model_validate(obj).model_dump(mode="json") for obj in partition]
+            if format == ExportFormat.csv:
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+                writer.writerows(_flatten(row) for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+def export_response(query, schema: type[BaseModel], format: ExportFormat, name: str):
+    media_type = "text/csv" if format == ExportFormat.csv else "application/x-ndjson"
+    extension = "csv" if format == ExportFormat.csv else "ndjson"
+    return StreamingResponse(
+        _stream(query, schema, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
@@ -0,0 +1,120 @@
+# Declarative list queries shared by the list and export endpoints.
+#
+# Each resource declares its model and response schema, the joins the schema
+# needs (nested schemas are read from joined tables, see loading.py), its
+# filterable fields (equality by default, or another comparison such as the
+# >= / <= of a date range), its search fields (search.py), its default order and the
+# fields a client may sort by (?sort=name, ?sort=-name for descending).
+# Resource.page() compiles a request into one statement (after the prefix
+# probe of an identifier-like search, see search.py): filters, search,
+# ORDER BY (search rank and the default order, or the requested sort; always
+# ending in the id tie-breaker), keyset or offset page and,
+# for total=exact, COUNT(*) OVER () (see pagination.py). A join that only a
+# filter needs is added when that filter is used. In fast mode
+# (FAST_SERIALIZATION=1) the page selects plain columns (serialization.py).
+#
+# Every sortable field has a (field, id) index (models.py), so a sorted page is
+# an index scan that stops after `limit` rows, not a sort of the whole filtered
+# set. The tie-breaker runs in the same direction as the field, which keeps the
+# keyset condition a single row comparison. An explicit sort replaces the
+# search ranking.
+#
+# No matches is an empty page, not a 404.
+import operator
+from typing import Callable, NamedTuple, Optional
+
+from fastapi import HTTPException, Query
+from sqlalchemy import select
+
+from database import read_session
+from export import export_response
+from loading import load_options
+from pagination import SortKey, fetch_page
+from schemas import TotalMode
+from search import SearchFields, apply_search
+from serialization import fast_rows
+
+
+class Filter(NamedTuple):
+    column: object
+    joins: tuple = ()            # relationships to join when the filter is used
+    enum: Optional[type] = None  # values are converted, anything else is a 400
+    op: Callable = operator.eq   # column op value, e.g. operator.ge for a range start
+
+
+def _order_by(keys):
+    return [k.expr.desc() if k.desc else k.expr.asc() for k in keys]
+
+
+class Resource:
+    def __init__(self, model, schema, *, joins=(), filters=None, search: Optional[SearchFields] = None, order=None, sorts=None):
+        self.model = model
+        self.schema = schema
+        self.joins = tuple(joins)
+        self.filters = filters or {}
+        self.search = search
+        self.order = order or [SortKey(model.id)]
+        self.sorts = {**(sorts or {}), "id": model.id}
+        self.load = load_options(model, schema, joined=[attr.property.mapper.class_ for attr in self.joins])
+        self.rows = fast_rows(model, schema)
+
+    def _value(self, name, spec, value):
+        if spec.enum is None or isinstance(value, spec.enum):
+            return value
+        try:
+            return spec.enum(value)
+        except ValueError:
+            choices = " or ".join(repr(member.value) for member in spec.enum)
+            raise HTTPException(status_code=400, detail=f"Invalid {name}. Use {choices}.")
+
+    async def query(self, db, search=None, fast=False, **filters):
+        # (query, rank sort keys); fast selects the serializer's columns instead of entities
+        query = self.rows.select() if fast and self.rows else select(self.model).options(*self.load)
+        joins = list(self.joins)
+        conditions = []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            spec = self.filters[name]
+            conditions.append(spec.op(spec.column, self._value(name, spec, value)))
+            joins += [attr for attr in spec.joins if not any(attr is joined for joined in joins)]
+        for attr in joins:
+            query = query.join(attr)
+        if conditions:
+            query = query.filter(*conditions)
+        if self.search is None:
+            return query, []
+        return await apply_search(db, query, self.search, search)
+
+    def sort_query(self):
+        # the ?sort= parameter, documented with this resource's fields
+        return Query(None, description=f"Sort by {', '.join(self.sorts)}; prefix with - for descending")
+
+    def sort_keys(self, sort):
+        desc = sort.startswith("-")
+        column = self.sorts.get(sort.removeprefix("-"))
+        if column is None:
+            raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of: {', '.join(self.sorts)} (- prefix for descending).")
+        if column is self.model.id:
+            return [SortKey(column, desc)]
+        return [SortKey(column, desc), SortKey(self.model.id, desc)]
+
+    async def page(self, db, limit, skip=0, cursor=None, total=TotalMode.exact, search=None, sort=None, **filters):
+        query, rank = await self.query(db, search, fast=True, **filters)
+        keys = self.sort_keys(sort) if sort else rank + self.order
+        return await fetch_page(db, query, keys, limit, skip, cursor, total, sort)
+
+    def response(self, page, headers=None):
+        # fast mode: ready JSON; otherwise the page goes through the route's response_model
+        return self.rows.response(page, headers) if self.rows else page
+
+    def dumps(self, page, response_model) -> bytes:
+        if self.rows:
+            return self.rows.dumps(page)
+        return response_model.model_validate(page).model_dump_json().encode()
+
+    async def export(self, format, filename, search=None, **filters):
+        # the search's fast-path probe runs on a session of its own, like the export itself (export.py)
+        async with await read_session() as db:
+            query, _ = await self.query(db, search, **filters)
+        return export_response(query.order_by(*_order_by(self.order)), self.schema, format, filename)
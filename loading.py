@@ -0,0 +1,67 @@
+# Relationship loading driven by the response schemas.
+#
+# A *Out schema that nests another schema (SuspendedEmployeeOut.employee ->
+# CompanyEmployeeWithCompanyOut.company) tells us which relationships the
+# response will touch. load_options() turns that into loader options up front:
+# contains_eager() for relationships the query already joins (filtering needs
+# the join anyway) and selectinload() for the rest, so a page costs a fixed
+# number of statements whatever its size. Everything else gets raiseload(), so
+# a relationship missing from the plan fails loudly instead of lazy loading.
+# Each entity also gets load_only() with just the columns its schema reads
+# (CompanySimpleOut -> companies.id, companies.name), so the SELECT lists stay narrow.
+import typing
+
+from pydantic import BaseModel
+from sqlalchemy import inspect
+from sqlalchemy.orm import contains_eager, load_only, raiseload, selectinload
+
+
+def nested_schema(annotation):
+    # BaseModel subclass inside the annotation (list[X], Optional[X], X), if any
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        found = nested_schema(arg)
+        if found is not None:
+            return found
+    return None
+
+
+def _relationship_plan(model, schema):
+    relationships = inspect(model).relationships
+    for name, field in schema.model_fields.items():
+        nested = nested_schema(field.annotation)
+        if nested is not None and name in relationships:
+            yield getattr(model, name), relationships[name].mapper.class_, nested
+
+
+def schema_columns(model, schema):
+    # the column attributes a `schema` row needs from `model`: its scalar fields,
+    # the primary key, and the local columns of the relationships it nests
+    # (the FK a many-to-one is loaded by, the key a one-to-many is matched on)
+    mapper = inspect(model)
+    columns = [mapper.get_property_by_column(column) for column in mapper.primary_key]
+    columns += [mapper.column_attrs[name] for name in schema.model_fields if name in mapper.column_attrs]
+    for attr, _, _ in _relationship_plan(model, schema):
+        columns += [mapper.get_property_by_column(column) for column in attr.property.local_columns]
+    return [getattr(model, prop.key) for prop in dict.fromkeys(columns)]
+
+
+def _loaders(model, schema, joined, parent=None):
+    columns = schema_columns(model, schema)
+    options = [parent.load_only(*columns) if parent is not None else load_only(*columns)]
+    for attr, target, nested in _relationship_plan(model, schema):
+        if target in joined:
+            loader = parent.contains_eager(attr) if parent is not None else contains_eager(attr)
+        else:
+            loader = parent.selectinload(attr) if parent is not None else selectinload(attr)
+        options.append(loader)
+        options.extend(_loaders(target, nested, joined if target in joined else set(), loader))
+        options.append(loader.raiseload("*"))
+    return options
+
+
+def load_options(model, schema, joined=()):
+    # loader options for a query on `model` whose rows are serialized with `schema`;
+    # `joined` lists the mapped classes the query already joins for filtering
+    return _loaders(model, schema, set(joined)) + [raiseload("*")]
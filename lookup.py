@@ -0,0 +1,47 @@
+# Batch lookups (POST /…/lookup): up to LOOKUP_MAX_KEYS keys resolved with a
+# single `= ANY(:keys)` query instead of one request per key. On Postgres the
+# keys travel as one array parameter, so the statement text (and its prepared
+# plan) is the same whatever the batch size.
+from sqlalchemy import any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+
+def any_of(db, column, keys):
+    if db.bind.dialect.name == "postgresql":
+        return column == any_(bindparam("keys", list(keys), type_=ARRAY(column.type)))
+    return column.in_(list(keys))
+
+
+def unique_keys(keys):
+    return list(dict.fromkeys(keys))
+
+
+def int_key(key):
+    # the key as an INTEGER column value, or None. isdigit() alone lets "²" through, which int() rejects
+    if key.isascii() and key.isdecimal() and int(key) < 2**31:
+        return int(key)
+    return None
+
+
+def int_keys(keys):
+    # id lookups: numeric keys that fit an INTEGER column -> every key as sent that names it
+    # ("1" and "01" are both answered); the rest can't match
+    ids = {}
+    for key in keys:
+        if int_key(key) is not None:
+            ids.setdefault(int_key(key), []).append(key)
+    return ids
+
+
+def split_found(keys, found):
+    # found: requested key -> record; keeps the request order in both parts
+    return {
+        "found": {key: found[key] for key in keys if key in found},
+        "missing": [key for key in keys if key not in found],
+    }
+
+
+def with_status(schema, obj, **status):
+    # a *LookupOut: the record's own fields plus the status columns from the same query
+    fields = {name: getattr(obj, name) for name in schema.model_fields if name not in status}
+    return schema.model_validate({**fields, **status})
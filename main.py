@@ -1,23 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Response, Request, Query
 from typing import List, Optional
-from datetime import date, datetime
+from datetime import date
+import operator
 import models
 import schemas
 from fastapi.middleware.cors import CORSMiddleware
-from database import SessionLocal, engine
-from sqlalchemy import func
-from fastapi import Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
-from models import CompanyTypeEnum  # Assuming it's already imported
-from sqlalchemy import cast, String
-from sqlalchemy.orm import joinedload
-
-
-
-
-app = FastAPI()
-models.Base.metadata.create_all(bind=engine)
+from fastapi.responses import JSONResponse, PlainTextResponse
+from database import get_db, get_read_db, pool_status, AsyncSessionLocal, ping, last_ping, dispose, ReadYourWritesMiddleware
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import CompanyTypeEnum
+from search import EMPLOYEE_SEARCH, COMPANY_SEARCH, SUSPENDED_BENEFICIARY_SEARCH
+from pagination import SortKey
+from loading import load_options
+from bulk import bulk_load
+from cache import cache
+from pydantic import TypeAdapter
+from conditional import conditional, request_versions, ConditionalHeadersMiddleware
+from listing import Resource, Filter
+from group_commit import create
+from stats import stats_refresher, read_stats
+from lookup import any_of, unique_keys, int_keys, split_found, with_status
+from contextlib import asynccontextmanager
+from suspensions import suspension_index, exact_check
+import orjson
+import metrics
+from singleflight import SingleFlightMiddleware
+
+
+# Schema changes are applied with `alembic upgrade head` before deploying, not at startup
+@asynccontextmanager
+async def lifespan(app):
+    stats_refresher.start()
+    suspension_index.start()
+    yield
+    await suspension_index.stop()
+    await stats_refresher.stop()
+    # the server has drained in-flight requests by now (see server.py), close the pools
+    await dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,306 +48,485 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
-
-# Dependency: Database session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+app.add_middleware(ConditionalHeadersMiddleware)
+app.add_middleware(ReadYourWritesMiddleware)  # no-op without DATABASE_REPLICA_URLS
+# identical concurrent requests to the hot dashboard routes share one execution (see singleflight.py)
+app.add_middleware(SingleFlightMiddleware, paths=[
+    "/company_employees", "/suspended_employees", "/companies", "/companies_sales", "/companies_installation",
+    "/beneficiaries", "/suspended_beneficiaries", "/service_providers", "/stats",
+])
+app.add_middleware(metrics.MetricsMiddleware)  # outermost, so it times everything below
+
+# Relationship loading per response model (see loading.py; the list resources carry their own)
+SERVICE_PROVIDER_LOAD = load_options(models.ServiceProvider, schemas.ServiceProviderOut)
+COMPANY_LOAD = load_options(models.Company, schemas.CompanyOut)
+EMPLOYEE_LOAD = load_options(models.CompanyEmployee, schemas.CompanyEmployeeOut)
+BENEFICIARY_LOAD = load_options(models.Beneficiary, schemas.BeneficiaryOut)
+SUSPENDED_BENEFICIARY_LOAD = load_options(models.SuspendedBeneficiary, schemas.SuspendedBeneficiaryOut)
+SUSPENDED_EMPLOYEE_LOAD = load_options(models.SuspendedEmployee, schemas.SuspendedEmployeeOut)
+
+# ETag checks per route (see conditional.py); reference data may be reused for 30s without asking
+REFERENCE_CACHE_CONTROL = "public, max-age=30"
+SERVICE_PROVIDERS_ETAG = Depends(conditional("service_providers", cache_control=REFERENCE_CACHE_CONTROL))
+COMPANIES_ETAG = Depends(conditional("companies", cache_control=REFERENCE_CACHE_CONTROL))
+EMPLOYEES_ETAG = Depends(conditional("company_employees", "companies"))
+SUSPENDED_EMPLOYEES_ETAG = Depends(conditional("suspended_employees", "company_employees", "companies"))
+BENEFICIARIES_ETAG = Depends(conditional("beneficiaries"))
+SUSPENDED_BENEFICIARIES_ETAG = Depends(conditional("suspended_beneficiaries", "beneficiaries"))
+STATS_ETAG = Depends(conditional("suspension_stats"))  # bumped by each stats refresh
+
+# JSON encoders for the cached reference data (see cache.py)
+SERVICE_PROVIDER_LIST = TypeAdapter(List[schemas.ServiceProviderOut])
 
 @app.get("/")
 def read_root():
     return {"message": "API متاحة. استخدمي المسارات مثل /company_employees و /stop_requests"}
 
-@app.get("/service_providers", response_model=List[schemas.ServiceProviderOut])
-async def list_service_providers(db: Session = Depends(get_db)):
-    providers = db.query(models.ServiceProvider).all()
-    return providers
+@app.get("/service_providers", response_model=List[schemas.ServiceProviderOut], dependencies=[SERVICE_PROVIDERS_ETAG])
+async def list_service_providers(request: Request, db: AsyncSession = Depends(get_db)):
+    async def load():
+        providers = (await db.scalars(select(models.ServiceProvider).options(*SERVICE_PROVIDER_LOAD))).all()
+        return SERVICE_PROVIDER_LIST.dump_json(SERVICE_PROVIDER_LIST.validate_python(providers, from_attributes=True))
+
+    return await cache.json_response("service_providers", "all", load, request_versions(request))
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(cache.stats(), pool_status()), media_type=metrics.CONTENT_TYPE)
+
+
+# --- فحص الحياة والجاهزية (للـ load balancer / orchestrator) ---
+# live: the worker answers, without touching the database; the DB state is the one
+# the last readiness probe found, so a database outage takes workers out of
+# rotation instead of restarting them all, and a hung DB can't stall the probe.
+# ready: 503 until the database answers.
+@app.get("/health/live")
+async def liveness():
+    return {"status": "ok", "database": last_ping()}
+
+
+@app.get("/health/ready")
+async def readiness():
+    try:
+        await ping()
+    except Exception:
+        return JSONResponse({"status": "unavailable", "database": "unreachable"}, status_code=503)
+    return {"status": "ok", "database": "ok"}
 
 
 # --- إدخال بيانات شركة ---
 @app.post("/companies", response_model=schemas.CompanyOut)
-async def create_company(company: schemas.CompanyCreate, db: Session = Depends(get_db)):
-    db_company = models.Company(**company.dict())
-    db.add(db_company)
-    db.commit()
-    db.refresh(db_company)
+async def create_company(company: schemas.CompanyCreate, db: AsyncSession = Depends(get_db)):
+    db_company = await create(db, models.Company, company.dict())
+    await cache.invalidate("companies")
     return db_company
 
 # --- إدخال بيانات موظف في شركة ---
 @app.post("/company_employees", response_model=schemas.CompanyEmployeeOut)
-async def create_company_employee(company_employee: schemas.CompanyEmployeeCreate, db: Session = Depends(get_db)):
-    db_company_employee = models.CompanyEmployee(**company_employee.dict())
-    db.add(db_company_employee)
-    db.commit()
-    db.refresh(db_company_employee)
-    return db_company_employee
+async def create_company_employee(company_employee: schemas.CompanyEmployeeCreate, db: AsyncSession = Depends(get_db)):
+    return await create(db, models.CompanyEmployee, company_employee.dict())
 
 # --- إدخال بيانات موظف موقوف ---
 @app.post("/suspended_employees", response_model=schemas.SuspendedEmployeeOut)
-async def create_suspended_employee(suspended_employee: schemas.SuspendedEmployeeCreate, db: Session = Depends(get_db)):
-    db_suspended_employee = models.SuspendedEmployee(**suspended_employee.dict())
-    db.add(db_suspended_employee)
-    db.commit()
-    db.refresh(db_suspended_employee)
+async def create_suspended_employee(suspended_employee: schemas.SuspendedEmployeeCreate, db: AsyncSession = Depends(get_db)):
+    db_suspended_employee = await create(db, models.SuspendedEmployee, suspended_employee.dict())
+    stats_refresher.changed()
+    await suspension_index.sync(db)
+    # الرد فيه الموظف وشركته، نحملهم مع بعض لأن الـ lazy load ما يشتغل مع async
+    db_suspended_employee = await db.scalar(
+        select(models.SuspendedEmployee)
+        .options(*SUSPENDED_EMPLOYEE_LOAD)
+        .filter(models.SuspendedEmployee.id == db_suspended_employee.id)
+    )
     return db_suspended_employee
 
 
 # --- إدخال بيانات مستفيد ---
 @app.post("/beneficiaries", response_model=schemas.BeneficiaryOut)
-async def create_beneficiary(beneficiary: schemas.BeneficiaryCreate, db: Session = Depends(get_db)):
-    db_beneficiary = models.Beneficiary(**beneficiary.dict())
-    db.add(db_beneficiary)
-    db.commit()
-    db.refresh(db_beneficiary)
-    return db_beneficiary
+async def create_beneficiary(beneficiary: schemas.BeneficiaryCreate, db: AsyncSession = Depends(get_db)):
+    return await create(db, models.Beneficiary, beneficiary.dict())
 
 # --- إدخال بيانات مستفيد موقوف ---
 @app.post("/suspended_beneficiaries", response_model=schemas.SuspendedBeneficiaryOut)
-async def create_suspended_beneficiary(suspended_beneficiary: schemas.SuspendedBeneficiaryCreate, db: Session = Depends(get_db)):
-    db_suspended_beneficiary = models.SuspendedBeneficiary(**suspended_beneficiary.dict())
-    db.add(db_suspended_beneficiary)
-    db.commit()
-    db.refresh(db_suspended_beneficiary)
+async def create_suspended_beneficiary(suspended_beneficiary: schemas.SuspendedBeneficiaryCreate, db: AsyncSession = Depends(get_db)):
+    db_suspended_beneficiary = await create(db, models.SuspendedBeneficiary, suspended_beneficiary.dict())
+    stats_refresher.changed()
+    await suspension_index.sync(db)
     return db_suspended_beneficiary
 
 # --- إدخال بيانات مزود خدمة ---
 @app.post("/service_providers", response_model=schemas.ServiceProviderOut)
-async def create_service_provider(service_provider: schemas.ServiceProviderCreate, db: Session = Depends(get_db)):
-    db_service_provider = models.ServiceProvider(**service_provider.dict())
-    db.add(db_service_provider)
-    db.commit()
-    db.refresh(db_service_provider)
+async def create_service_provider(service_provider: schemas.ServiceProviderCreate, db: AsyncSession = Depends(get_db)):
+    db_service_provider = await create(db, models.ServiceProvider, service_provider.dict())
+    await cache.invalidate("service_providers")
     return db_service_provider
 
 # --- تعيين موظف إلى مزود خدمة ---
 @app.post("/employee_service_provider", response_model=schemas.EmployeeServiceProviderOut)
-async def assign_employee_service_provider(employee_service_provider: schemas.EmployeeServiceProviderCreate, db: Session = Depends(get_db)):
-    db_assignment = models.EmployeeServiceProvider(**employee_service_provider.dict())
-    db.add(db_assignment)
-    db.commit()
-    db.refresh(db_assignment)
+async def assign_employee_service_provider(employee_service_provider: schemas.EmployeeServiceProviderCreate, db: AsyncSession = Depends(get_db)):
+    db_assignment = await create(db, models.EmployeeServiceProvider, employee_service_provider.dict())
+    stats_refresher.changed()
     return db_assignment
 
 
-@app.get("/company_employees", response_model=schemas.EmployeeListResponse)
+# --- إدخال جماعي (JSON array / NDJSON / CSV) ---
+@app.post("/companies/bulk", response_model=schemas.BulkResult)
+async def bulk_create_companies(request: Request, method: schemas.BulkMethod = schemas.BulkMethod.insert, db: AsyncSession = Depends(get_db)):
+    result = await bulk_load(db, request, models.Company, schemas.CompanyCreate, method)
+    await cache.invalidate("companies")
+    return result
+
+@app.post("/company_employees/bulk", response_model=schemas.BulkResult)
+async def bulk_create_company_employees(request: Request, method: schemas.BulkMethod = schemas.BulkMethod.insert, db: AsyncSession = Depends(get_db)):
+    return await bulk_load(db, request, models.CompanyEmployee, schemas.CompanyEmployeeCreate, method)
+
+@app.post("/suspended_employees/bulk", response_model=schemas.BulkResult)
+async def bulk_create_suspended_employees(request: Request, method: schemas.BulkMethod = schemas.BulkMethod.insert, db: AsyncSession = Depends(get_db)):
+    result = await bulk_load(db, request, models.SuspendedEmployee, schemas.SuspendedEmployeeCreate, method)
+    stats_refresher.changed()
+    await suspension_index.sync(db)
+    return result
+
+@app.post("/beneficiaries/bulk", response_model=schemas.BulkResult)
+async def bulk_create_beneficiaries(request: Request, method: schemas.BulkMethod = schemas.BulkMethod.insert, db: AsyncSession = Depends(get_db)):
+    return await bulk_load(db, request, models.Beneficiary, schemas.BeneficiaryCreate, method)
+
+@app.post("/suspended_beneficiaries/bulk", response_model=schemas.BulkResult)
+async def bulk_create_suspended_beneficiaries(request: Request, method: schemas.BulkMethod = schemas.BulkMethod.insert, db: AsyncSession = Depends(get_db)):
+    result = await bulk_load(db, request, models.SuspendedBeneficiary, schemas.SuspendedBeneficiaryCreate, method)
+    stats_refresher.changed()
+    await suspension_index.sync(db)
+    return result
+
+@app.post("/service_providers/bulk", response_model=schemas.BulkResult)
+async def bulk_create_service_providers(request: Request, method: schemas.BulkMethod = schemas.BulkMethod.insert, db: AsyncSession = Depends(get_db)):
+    result = await bulk_load(db, request, models.ServiceProvider, schemas.ServiceProviderCreate, method)
+    await cache.invalidate("service_providers")
+    return result
+
+@app.post("/employee_service_provider/bulk", response_model=schemas.BulkResult)
+async def bulk_create_employee_service_provider(request: Request, method: schemas.BulkMethod = schemas.BulkMethod.insert, db: AsyncSession = Depends(get_db)):
+    result = await bulk_load(db, request, models.EmployeeServiceProvider, schemas.EmployeeServiceProviderCreate, method)
+    stats_refresher.changed()
+    return result
+
+
+# --- فحص سريع: هل رقم الهوية موقوف؟ (من الفهرس في الذاكرة، انظر suspensions.py) ---
+@app.get("/suspensions/check", response_model=schemas.SuspensionCheckOut)
+async def check_suspension(
+    national_id: str,
+    exact: bool = Query(False, description="Ask the database instead of the in-memory index"),
+):
+    if exact or not suspension_index.ready:
+        async with AsyncSessionLocal() as db:
+            employee, beneficiary = await exact_check(db, national_id)
+    else:
+        employee, beneficiary = suspension_index.check(national_id)
+    # هذا المسار حار جداً، نرجع الـ JSON مباشرة بدون تحقق pydantic
+    body = {"national_id": national_id, "suspended": employee or beneficiary, "employee": employee, "beneficiary": beneficiary}
+    return Response(orjson.dumps(body), media_type="application/json")
+
+
+# --- بحث جماعي: عدة مفاتيح في طلب واحد واستعلام واحد (= ANY) مع حالة الإيقاف ---
+@app.post("/beneficiaries/lookup", response_model=schemas.BeneficiaryLookupResult)
+async def lookup_beneficiaries(lookup: schemas.LookupRequest, db: AsyncSession = Depends(get_read_db)):
+    keys = unique_keys(lookup.keys)
+    latest = func.max(models.SuspendedBeneficiary.suspended_at)
+    rows = await db.execute(
+        select(models.Beneficiary, latest).options(*BENEFICIARY_LOAD)
+        .outerjoin(models.SuspendedBeneficiary, models.SuspendedBeneficiary.beneficiary_id == models.Beneficiary.id)
+        .filter(any_of(db, models.Beneficiary.national_id, keys))
+        .group_by(models.Beneficiary.id)
+    )
+    found = {
+        beneficiary.national_id: with_status(schemas.BeneficiaryLookupOut, beneficiary, suspended=suspended_at is not None, suspended_at=suspended_at)
+        for beneficiary, suspended_at in rows
+    }
+    return split_found(keys, found)
+
+@app.post("/company_employees/lookup", response_model=schemas.CompanyEmployeeLookupResult)
+async def lookup_company_employees(
+    lookup: schemas.LookupRequest,
+    by: schemas.EmployeeLookupKey = Query(schemas.EmployeeLookupKey.id, description="Match keys against id or national_id"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    keys = unique_keys(lookup.keys)
+    if by == schemas.EmployeeLookupKey.id:
+        ids = int_keys(keys)
+        column, values, keys_of = models.CompanyEmployee.id, list(ids), lambda employee: ids[employee.id]
+    else:
+        column, values, keys_of = models.CompanyEmployee.national_id, keys, lambda employee: [employee.national_id]
+    latest = func.max(models.SuspendedEmployee.suspended_at)
+    rows = await db.execute(
+        select(models.CompanyEmployee, latest).options(*EMPLOYEE_LOAD)
+        .outerjoin(models.SuspendedEmployee, models.SuspendedEmployee.employee_id == models.CompanyEmployee.id)
+        .filter(any_of(db, column, values))
+        .group_by(models.CompanyEmployee.id)
+    )
+    found = {
+        key: with_status(schemas.CompanyEmployeeLookupOut, employee, suspended=suspended_at is not None, suspended_at=suspended_at)
+        for employee, suspended_at in rows
+        for key in keys_of(employee)
+    }
+    return split_found(keys, found)
+
+@app.post("/companies/lookup", response_model=schemas.CompanyLookupResult)
+async def lookup_companies(lookup: schemas.LookupRequest, db: AsyncSession = Depends(get_read_db)):
+    keys = unique_keys(lookup.keys)
+    # employees with at least one suspension, not suspension rows
+    suspended = func.count(distinct(models.SuspendedEmployee.employee_id))
+    rows = await db.execute(
+        select(models.Company, suspended).options(*COMPANY_LOAD)
+        .outerjoin(models.CompanyEmployee, models.CompanyEmployee.company_id == models.Company.id)
+        .outerjoin(models.SuspendedEmployee, models.SuspendedEmployee.employee_id == models.CompanyEmployee.id)
+        .filter(any_of(db, models.Company.unified_number, keys))
+        .group_by(models.Company.id)
+        .order_by(models.Company.id)
+    )
+    found = {}
+    for company, count in rows:
+        # unified_number isn't unique; like get_company, the first match wins
+        found.setdefault(company.unified_number, with_status(schemas.CompanyLookupOut, company, suspended_employees=count))
+    return split_found(keys, found)
+
+@app.post("/suspended_beneficiaries/lookup", response_model=schemas.SuspendedBeneficiaryLookupResult)
+async def lookup_suspended_beneficiaries(lookup: schemas.LookupRequest, db: AsyncSession = Depends(get_read_db)):
+    keys = unique_keys(lookup.keys)
+    ids = int_keys(keys)
+    suspensions = await db.scalars(
+        select(models.SuspendedBeneficiary).join(models.Beneficiary).options(*SUSPENDED_BENEFICIARIES.load)
+        .filter(any_of(db, models.SuspendedBeneficiary.id, list(ids)))
+    )
+    return split_found(keys, {key: suspension for suspension in suspensions for key in ids[suspension.id]})
+
+
+# --- القوائم: كل مورد يعرّف الفلاتر والبحث والترتيب، والاستعلام يُبنى في listing.py ---
+EMPLOYEES = Resource(
+    models.CompanyEmployee, schemas.CompanyEmployeeOut,
+    filters={
+        "company_id": Filter(models.CompanyEmployee.company_id),
+        "company_type": Filter(models.Company.type, joins=(models.CompanyEmployee.company,), enum=CompanyTypeEnum),
+    },
+    search=EMPLOYEE_SEARCH,
+    sorts={"name": models.CompanyEmployee.name, "company_id": models.CompanyEmployee.company_id},
+)
+SUSPENDED_EMPLOYEES = Resource(
+    models.SuspendedEmployee, schemas.SuspendedEmployeeOut,
+    joins=[models.SuspendedEmployee.employee, models.CompanyEmployee.company],
+    filters={
+        "company_type": Filter(models.Company.type, enum=CompanyTypeEnum),
+        "since": Filter(models.SuspendedEmployee.suspended_at, op=operator.ge),
+        "until": Filter(models.SuspendedEmployee.suspended_at, op=operator.le),
+    },
+    search=EMPLOYEE_SEARCH,
+    sorts={"suspended_at": models.SuspendedEmployee.suspended_at, "employee_id": models.SuspendedEmployee.employee_id},
+)
+COMPANIES = Resource(
+    models.Company, schemas.CompanyOut,
+    filters={"type": Filter(models.Company.type, enum=CompanyTypeEnum)},
+    search=COMPANY_SEARCH,
+    sorts={"name": models.Company.name},
+)
+BENEFICIARIES = Resource(models.Beneficiary, schemas.BeneficiaryOut, sorts={"name": models.Beneficiary.name})
+SUSPENDED_BENEFICIARIES = Resource(
+    models.SuspendedBeneficiary, schemas.SuspendedBeneficiaryWithBeneficiaryOut,
+    joins=[models.SuspendedBeneficiary.beneficiary],
+    filters={
+        "since": Filter(models.SuspendedBeneficiary.suspended_at, op=operator.ge),
+        "until": Filter(models.SuspendedBeneficiary.suspended_at, op=operator.le),
+    },
+    search=SUSPENDED_BENEFICIARY_SEARCH,
+    order=[SortKey(models.SuspendedBeneficiary.suspended_at, desc=True), SortKey(models.SuspendedBeneficiary.id, desc=True)],
+    sorts={"suspended_at": models.SuspendedBeneficiary.suspended_at},
+)
+
+CURSOR_QUERY = Query(None, description="Opaque cursor from the previous page's next_cursor")
+TOTAL_QUERY = Query(schemas.TotalMode.exact, description="exact, estimate (planner statistics) or none (has_more only)")
+# the suspension tables are partitioned by month on suspended_at (see partitions.py): a range only reads its months
+SINCE_QUERY = Query(None, description="First suspended_at day included")
+UNTIL_QUERY = Query(None, description="Last suspended_at day included")
+
+
+@app.get("/company_employees", response_model=schemas.EmployeeListResponse, dependencies=[EMPLOYEES_ETAG])
 async def list_company_employees(
     skip: int = 0,
     limit: int = 100,
     search: str = Query("", description="Search by name, national_id, or job_number"),
     company_id: int = Query(None, description="Optional filter by company ID"),
     company_type: str = Query(None, description="Filter by company type: sales or installation"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: schemas.TotalMode = TOTAL_QUERY,
+    sort: Optional[str] = EMPLOYEES.sort_query(),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(models.CompanyEmployee).join(models.Company)
-
-    # Filter by company ID
-    if company_id is not None:
-        query = query.filter(models.CompanyEmployee.company_id == company_id)
-        company_name = db.query(models.Company.name).filter(models.Company.id == company_id).scalar()
-        
-
-    # Filter by company type (sales or installation)
-    if company_type:
-        try:
-            enum_value = CompanyTypeEnum(company_type)
-            query = query.filter(models.Company.type == enum_value)
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid company_type. Use 'sales' or 'installation'.")
-
-    # Search by name, national_id, or job_number
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(models.CompanyEmployee.name).like(search_term),
-                func.lower(models.CompanyEmployee.national_id).like(search_term),
-                func.lower(models.CompanyEmployee.job_number).like(search_term),
-            )
-        )
-
-    total = query.count()
-    if total == 0:
-        raise HTTPException(status_code=404, detail="No company employees found")
-
-    employees = query.offset(skip).limit(limit).all()
-    return {"total": total, "data": employees}
-
-@app.get("/suspended_employees", response_model=schemas.SuspendedEmployeeListResponse)
+    page = await EMPLOYEES.page(db, limit, skip, cursor, total, search, sort, company_id=company_id, company_type=company_type)
+    return EMPLOYEES.response(page)
+
+@app.get("/suspended_employees", response_model=schemas.SuspendedEmployeeListResponse, dependencies=[SUSPENDED_EMPLOYEES_ETAG])
 async def list_suspended_employees(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = Query(None, description="Search by national_id or job_number"),
     company_type: Optional[CompanyTypeEnum] = Query(None, description="Filter by company type: sales or installation"),
-    db: Session = Depends(get_db)
+    since: Optional[date] = SINCE_QUERY,
+    until: Optional[date] = UNTIL_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: schemas.TotalMode = TOTAL_QUERY,
+    sort: Optional[str] = SUSPENDED_EMPLOYEES.sort_query(),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(models.SuspendedEmployee).join(models.SuspendedEmployee.employee).join(models.CompanyEmployee.company)
-
-    # فلترة بحسب نوع الشركة
-    if company_type:
-        query = query.filter(models.Company.type == company_type)
-
-    # فلترة بحسب البحث
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(models.CompanyEmployee.national_id).like(search_term),
-                func.lower(models.CompanyEmployee.job_number).like(search_term),
-                func.lower(models.CompanyEmployee.name).like(search_term)
-            )
-        )
-
-    total = query.count()
-    if total == 0:
-        raise HTTPException(status_code=404, detail="No suspended employees found")
-
-    suspended_employees = query.offset(skip).limit(limit).all()
-    return {"total": total, "data": suspended_employees}
-# --- مثال: جلب كل مزودي الخدمة ---
-
-
-# --- مثال: جلب كل الشركات ---
-@app.get('/companies', response_model=schemas.CompanyListResponse)
-async def list_companies(type: str, skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    if type not in ["sales", "installation"]:
-        raise HTTPException(status_code=400, detail="Invalid company type")
+    page = await SUSPENDED_EMPLOYEES.page(db, limit, skip, cursor, total, search, sort, company_type=company_type, since=since, until=until)
+    return SUSPENDED_EMPLOYEES.response(page)
 
-    company_type = models.CompanyTypeEnum.sales if type == "sales" else models.CompanyTypeEnum.installation
 
-    total = db.query(func.count(models.Company.id))\
-              .filter(models.Company.type == company_type)\
-              .scalar()
+# --- الشركات: /companies و /companies_sales و /companies_installation نفس الاستعلام (ومن الكاش) ---
+async def companies_page(request, db, company_type, skip, limit, cursor, total, sort, search=""):
+    async def load():
+        page = await COMPANIES.page(db, limit, skip, cursor, total, search, sort, type=company_type)
+        return COMPANIES.dumps(page, schemas.CompanyListResponse)
 
-    if total == 0:
-        raise HTTPException(status_code=404, detail=f"No {type} companies found")
+    key = f"list:{company_type.value}:{search}:{sort}:{skip}:{limit}:{cursor}:{total.value}"
+    return await cache.json_response("companies", key, load, request_versions(request))
 
-    companies = db.query(models.Company)\
-                  .filter(models.Company.type == company_type)\
-                  .offset(skip)\
-                  .limit(limit)\
-                  .all()
 
-    return {"total": total, "data": companies}
+@app.get('/companies', response_model=schemas.CompanyListResponse, dependencies=[COMPANIES_ETAG])
+async def list_companies(request: Request, type: str, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                         total: schemas.TotalMode = schemas.TotalMode.exact, sort: Optional[str] = COMPANIES.sort_query(),
+                         db: AsyncSession = Depends(get_db)):
+    if type not in ["sales", "installation"]:
+        raise HTTPException(status_code=400, detail="Invalid company type")
+    return await companies_page(request, db, CompanyTypeEnum(type), skip, limit, cursor, total, sort)
 
 
-@app.get('/companies_sales', response_model=schemas.CompanyListResponse)
+@app.get('/companies_sales', response_model=schemas.CompanyListResponse, dependencies=[COMPANIES_ETAG])
 async def list_companies_sales(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: str = Query("", description="Search term to filter companies"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: schemas.TotalMode = TOTAL_QUERY,
+    sort: Optional[str] = COMPANIES.sort_query(),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(models.Company).filter(models.Company.type == models.CompanyTypeEnum.sales)
-
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(models.Company.name).like(search_term),
-                func.lower(models.Company.commercial_number).like(search_term),
-                func.lower(models.Company.unified_number).like(search_term)
-            )
-        )
+    return await companies_page(request, db, CompanyTypeEnum.sales, skip, limit, cursor, total, sort, search)
 
-    total = query.count()
-    if total == 0:
-        raise HTTPException(status_code=404, detail="No sales companies found")
 
-    companies = query.offset(skip).limit(limit).all()
-
-    return {"total": total, "data": companies}
-
-
-@app.get('/companies_installation', response_model=schemas.CompanyListResponse)
+@app.get('/companies_installation', response_model=schemas.CompanyListResponse, dependencies=[COMPANIES_ETAG])
 async def list_companies_installation(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: str = Query("", description="Search term to filter companies"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: schemas.TotalMode = TOTAL_QUERY,
+    sort: Optional[str] = COMPANIES.sort_query(),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(models.Company).filter(models.Company.type == models.CompanyTypeEnum.installation)
+    return await companies_page(request, db, CompanyTypeEnum.installation, skip, limit, cursor, total, sort, search)
 
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(models.Company.name).like(search_term),
-                func.lower(models.Company.commercial_number).like(search_term),
-                func.lower(models.Company.unified_number).like(search_term)
-            )
-        )
 
-    total = query.count()
-    if total == 0:
-        raise HTTPException(status_code=404, detail="No installation companies found")
+# --- تصدير القوائم كاملة (NDJSON / CSV) بنفس فلاتر القوائم ---
+# لازم تكون قبل مسارات التفاصيل مثل /companies/{unified_number} عشان ما تنمسك كـ id
+@app.get("/company_employees/export")
+async def export_company_employees(
+    search: str = "",
+    company_id: Optional[int] = None,
+    company_type: Optional[str] = None,
+    format: schemas.ExportFormat = schemas.ExportFormat.ndjson,
+):
+    return await EMPLOYEES.export(format, "company_employees", search, company_id=company_id, company_type=company_type)
+
+@app.get("/suspended_employees/export")
+async def export_suspended_employees(
+    search: Optional[str] = None,
+    company_type: Optional[CompanyTypeEnum] = None,
+    since: Optional[date] = SINCE_QUERY,
+    until: Optional[date] = UNTIL_QUERY,
+    format: schemas.ExportFormat = schemas.ExportFormat.ndjson,
+):
+    return await SUSPENDED_EMPLOYEES.export(format, "suspended_employees", search, company_type=company_type, since=since, until=until)
+
+@app.get("/companies/export")
+async def export_companies(type: CompanyTypeEnum, search: Optional[str] = None, format: schemas.ExportFormat = schemas.ExportFormat.ndjson):
+    return await COMPANIES.export(format, f"companies_{type.value}", search, type=type)
 
-    companies = query.offset(skip).limit(limit).all()
+@app.get("/beneficiaries/export")
+async def export_beneficiaries(format: schemas.ExportFormat = schemas.ExportFormat.ndjson):
+    return await BENEFICIARIES.export(format, "beneficiaries")
 
-    return {"total": total, "data": companies}
+@app.get("/suspended_beneficiaries/export")
+async def export_suspended_beneficiaries(search: Optional[str] = None, since: Optional[date] = SINCE_QUERY, until: Optional[date] = UNTIL_QUERY,
+                                         format: schemas.ExportFormat = schemas.ExportFormat.ndjson):
+    return await SUSPENDED_BENEFICIARIES.export(format, "suspended_beneficiaries", search, since=since, until=until)
 
 
-@app.get('/companies/{unified_number}', response_model=schemas.CompanyOut)
-async def get_company(unified_number: str, db: Session = Depends(get_db)):
-    company = db.query(models.Company).filter(models.Company.unified_number == unified_number).first()
-    if not company:
-        raise HTTPException(status_code=404, detail="Company not found")
-    return company
+@app.get('/companies/{unified_number}', response_model=schemas.CompanyOut, dependencies=[COMPANIES_ETAG])
+async def get_company(request: Request, unified_number: str, db: AsyncSession = Depends(get_db)):
+    async def load():
+        company = await db.scalar(select(models.Company).options(*COMPANY_LOAD).filter(models.Company.unified_number == unified_number).limit(1))
+        if not company:
+            raise HTTPException(status_code=404, detail="Company not found")
+        return schemas.CompanyOut.model_validate(company).model_dump_json().encode()
 
-@app.get('/company_employees/{employee_id}', response_model=schemas.CompanyEmployeeOut)
-async def get_company_employee(employee_id: int, db: Session = Depends(get_db)):
-    employee = db.query(models.CompanyEmployee).filter(models.CompanyEmployee.id == employee_id).first()
+    return await cache.json_response("companies", f"unified_number:{unified_number}", load, request_versions(request))
+
+@app.get('/company_employees/{employee_id}', response_model=schemas.CompanyEmployeeOut, dependencies=[EMPLOYEES_ETAG])
+async def get_company_employee(employee_id: int, db: AsyncSession = Depends(get_db)):
+    employee = await db.get(models.CompanyEmployee, employee_id, options=EMPLOYEE_LOAD)
     if not employee:
         raise HTTPException(status_code=404, detail="Company Employee not found")
     return employee
 
-@app.get('/beneficiaries/{national_id}', response_model=schemas.BeneficiaryOut)
-async def get_beneficiary(national_id: str, db: Session = Depends(get_db)):
-    beneficiary = db.query(models.Beneficiary).filter(models.Beneficiary.national_id == national_id).first()
+@app.get('/beneficiaries/{national_id}', response_model=schemas.BeneficiaryOut, dependencies=[BENEFICIARIES_ETAG])
+async def get_beneficiary(national_id: str, db: AsyncSession = Depends(get_db)):
+    beneficiary = await db.scalar(select(models.Beneficiary).options(*BENEFICIARY_LOAD).filter(models.Beneficiary.national_id == national_id))
     if not beneficiary:
         raise HTTPException(status_code=404, detail="Beneficiary not found")
     return beneficiary
 
-@app.get('/suspended_beneficiaries/{suspended_id}', response_model=schemas.SuspendedBeneficiaryOut)
-async def get_suspended_beneficiary(suspended_id: int, db: Session = Depends(get_db)):
-    suspended_beneficiary = db.query(models.SuspendedBeneficiary).filter(models.SuspendedBeneficiary.id == suspended_id).first()
+@app.get('/suspended_beneficiaries/{suspended_id}', response_model=schemas.SuspendedBeneficiaryOut, dependencies=[SUSPENDED_BENEFICIARIES_ETAG])
+async def get_suspended_beneficiary(suspended_id: int, db: AsyncSession = Depends(get_db)):
+    suspended_beneficiary = await db.get(models.SuspendedBeneficiary, suspended_id, options=SUSPENDED_BENEFICIARY_LOAD)
     if not suspended_beneficiary:
         raise HTTPException(status_code=404, detail="Suspended Beneficiary not found")
     return suspended_beneficiary
 
-@app.get('/beneficiaries', response_model=List[schemas.BeneficiaryOut])
-async def list_beneficiaries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    beneficiaries = db.query(models.Beneficiary).offset(skip).limit(limit).all()
-    return beneficiaries
-
-@app.get('/suspended_beneficiaries', response_model=schemas.SuspendedBeneficiaryListResponse)
+@app.get('/beneficiaries', response_model=List[schemas.BeneficiaryOut], dependencies=[BENEFICIARIES_ETAG])
+async def list_beneficiaries(response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                             sort: Optional[str] = BENEFICIARIES.sort_query(), db: AsyncSession = Depends(get_db)):
+    page = await BENEFICIARIES.page(db, limit, skip, cursor, schemas.TotalMode.none, sort=sort)
+    # the response is a plain list, so the cursor for the next page goes in a header
+    headers = {"X-Next-Cursor": page["next_cursor"]} if page["next_cursor"] else {}
+    if BENEFICIARIES.rows:
+        return BENEFICIARIES.response(page["data"], headers)
+    response.headers.update(headers)
+    return page["data"]
+
+@app.get('/suspended_beneficiaries', response_model=schemas.SuspendedBeneficiaryListResponse, dependencies=[SUSPENDED_BENEFICIARIES_ETAG])
 async def list_suspended_beneficiaries(
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    since: Optional[date] = SINCE_QUERY,
+    until: Optional[date] = UNTIL_QUERY,
+    cursor: Optional[str] = CURSOR_QUERY,
+    total: schemas.TotalMode = TOTAL_QUERY,
+    sort: Optional[str] = SUSPENDED_BENEFICIARIES.sort_query(),
+    db: AsyncSession = Depends(get_db)
 ):
-    query = db.query(models.SuspendedBeneficiary).join(models.Beneficiary).filter(
-        models.SuspendedBeneficiary.beneficiary_id == models.Beneficiary.id
-    ).options(
-        joinedload(models.SuspendedBeneficiary.beneficiary)
-    )
+    page = await SUSPENDED_BENEFICIARIES.page(db, limit, skip, cursor, total, search, sort, since=since, until=until)
+    return SUSPENDED_BENEFICIARIES.response(page)
 
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.filter(
-            or_(
-                func.lower(cast(models.SuspendedBeneficiary.beneficiary_id, String)).like(search_term),
-                func.lower(models.Beneficiary.name).like(search_term),
-                func.lower(models.Beneficiary.national_id).like(search_term),
-                func.lower(models.Beneficiary.phone).like(search_term),
-            )
-        )
-
-    total = query.count()
-    results = query.order_by(models.SuspendedBeneficiary.suspended_at.desc()).offset(skip).limit(limit).all()
-
-    return {"total": total, "data": results}
\ No newline at end of file
+
+# --- ملخص الإيقافات للوحة المعلومات (من الـ materialized views، انظر stats.py) ---
+@app.get('/stats', response_model=schemas.StatsOut, dependencies=[STATS_ETAG])
+async def get_stats(
+    since: Optional[date] = Query(None, description="First day included in by_day"),
+    until: Optional[date] = Query(None, description="Last day included in by_day"),
+    db: AsyncSession = Depends(get_db)
+):
+    return await read_stats(db, since, until)
@@ -0,0 +1,192 @@
+# Request and query instrumentation, exposed in Prometheus text format on /metrics.
+#
+# Counters live in process memory, so with several workers every worker reports
+# its own numbers (scrape each one, or sum them in Prometheus).
+import logging
+import os
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+BATCH_ROWS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+slow_query_log = logging.getLogger("slow_query")
+
+# queries run while handling the current request (None outside of a request)
+_request_queries = ContextVar("request_queries", default=None)
+
+
+class Histogram:
+    def __init__(self, name, help, buckets):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            base = _labels(label_names, labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {series[-2]}')
+            lines.append(f"{self.name}_count{{{base}}} {series[-2]}")
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.series = defaultdict(int)
+
+    def inc(self, labels, value=1):
+        self.series[labels] += value
+
+    def render(self, label_names):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{{{_labels(label_names, labels)}}} {value}" for labels, value in sorted(self.series.items())]
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_LABELS = ("method", "route")
+request_latency = Histogram("http_request_duration_seconds", "Request latency per route.", LATENCY_BUCKETS)
+response_size = Histogram("http_response_size_bytes", "Response body size per route.", SIZE_BUCKETS)
+responses = Counter("http_responses_total", "Responses per route and status code.")
+request_queries = Histogram("http_request_db_queries", "Database queries per request.", QUERY_COUNT_BUCKETS)
+
+QUERY_LABELS = ("operation",)
+query_latency = Histogram("db_query_duration_seconds", "Statement execution time.", LATENCY_BUCKETS)
+slow_queries = Counter("db_slow_queries_total", f"Statements slower than SLOW_QUERY_MS ({SLOW_QUERY_MS:g}ms).")
+coalesced_requests = Counter("http_coalesced_requests_total", "Coalesced GET requests per route: leader ran the app, follower/window reused its response (singleflight.py).")
+group_commit_rows = Histogram("db_group_commit_rows", "Rows written per group commit (group_commit.py).", BATCH_ROWS_BUCKETS)
+
+
+class MetricsMiddleware:
+    # pure ASGI, so streaming responses are measured until the last chunk is sent
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        queries = [0]
+        token = _request_queries.set(queries)
+
+        async def send_and_measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            _request_queries.reset(token)
+            route = scope.get("route")
+            # the route template, not the raw path, so ids don't create new series
+            labels = (scope["method"], route.path if route else "unmatched")
+            request_latency.observe(labels, time.perf_counter() - start)
+            response_size.observe(labels, size)
+            responses.inc(labels + (status,))
+            request_queries.observe(labels, queries[0])
+
+
+def _redacted(parameters):
+    if isinstance(parameters, dict):
+        return {key: "?" for key in parameters}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return f"<{len(parameters)} parameter sets>"  # executemany
+        return ["?"] * len(parameters)
+    return "?"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "unknown"
+    query_latency.observe((operation,), elapsed)
+    queries = _request_queries.get()
+    if queries is not None:
+        queries[0] += 1
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries.inc((operation,))
+        slow_query_log.warning(
+            "slow query (%.1fms): %s | parameters: %s", elapsed * 1000, " ".join(statement.split()), _redacted(parameters)
+        )
+
+
+def instrument_engine(engine):
+    # works for the sync engine and for async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render(cache_stats, pool):
+    lines = []
+    lines += request_latency.render(REQUEST_LABELS)
+    lines += response_size.render(REQUEST_LABELS)
+    lines += responses.render(REQUEST_LABELS + ("status",))
+    lines += request_queries.render(REQUEST_LABELS)
+    lines += query_latency.render(QUERY_LABELS)
+    lines += slow_queries.render(QUERY_LABELS)
+    lines += group_commit_rows.render(("table",))
+    lines += coalesced_requests.render(("route", "role"))
+    # share of coalesced requests that did not run the app themselves
+    totals = defaultdict(lambda: [0, 0])
+    for (route, role), count in coalesced_requests.series.items():
+        totals[route][0] += count
+        totals[route][1] += count if role != "leader" else 0
+    lines += ["# TYPE http_coalesced_collapse_ratio gauge"]
+    lines += [f'http_coalesced_collapse_ratio{{route="{_escape(route)}"}} {shared / total:.4f}' for route, (total, shared) in sorted(totals.items())]
+
+    for name, kind, key in (("cache_hits_total", "counter", "hits"), ("cache_misses_total", "counter", "misses")):
+        lines += [f"# TYPE {name} {kind}"]
+        lines += [f'{name}{{namespace="{_escape(ns)}"}} {stats[key]}' for ns, stats in cache_stats.items()]
+
+    # pool_status() is flat: one metric per number, the pool class as a label on db_pool_info
+    lines += ["# TYPE db_pool_info gauge", f'db_pool_info{{pool="{_escape(pool["pool"])}"}} 1']
+    for key, value in pool.items():
+        if key == "pool":
+            continue
+        kind = "counter" if key in ("checkouts", "waits", "timeouts", "wait_seconds_total") else "gauge"
+        name = f"db_pool_{key}" if kind == "gauge" or key.endswith("_total") else f"db_pool_{key}_total"
+        lines += [f"# TYPE {name} {kind}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,41 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+import models
+from database import DATABASE_URL
+from partitions import is_partition
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# models.py is the source for autogenerate: alembic revision --autogenerate -m "..."
+target_metadata = models.Base.metadata
+
+
+def include_name(name, type_, parent_names):
+    # the monthly partitions are made at runtime (partitions.py), models.py only has their parents
+    return not (type_ == "table" and is_partition(name))
+
+
+def run_migrations_offline():
+    # alembic upgrade head --sql: print the SQL instead of running it
+    context.configure(url=DATABASE_URL, target_metadata=target_metadata, include_name=include_name, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(DATABASE_URL, poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, include_name=include_name)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
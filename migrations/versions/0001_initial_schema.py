@@ -0,0 +1,105 @@
+"""initial schema
+
+Exactly the schema the original main.py built at import time with
+models.Base.metadata.create_all(): the tables, their primary keys, foreign keys
+and index=True / unique=True indexes, nothing else. A database created that way
+matches this revision: mark it with `alembic stamp 0001` once, then
+`alembic upgrade head` adds everything since (search indexes and change
+tracking come in 0001a).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:12:30.545897
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('beneficiaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('national_id', sa.String(), nullable=False),
+    sa.Column('phone', sa.String(), nullable=False),
+    sa.Column('nationality', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_beneficiaries_id'), 'beneficiaries', ['id'], unique=False)
+    op.create_index(op.f('ix_beneficiaries_name'), 'beneficiaries', ['name'], unique=False)
+    op.create_index(op.f('ix_beneficiaries_national_id'), 'beneficiaries', ['national_id'], unique=True)
+    op.create_table('companies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('commercial_number', sa.String(), nullable=False),
+    sa.Column('unified_number', sa.String(), nullable=False),
+    sa.Column('type', sa.Enum('sales', 'installation', name='company_type'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_companies_id'), 'companies', ['id'], unique=False)
+    op.create_index(op.f('ix_companies_name'), 'companies', ['name'], unique=False)
+    op.create_table('company_employees',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('national_id', sa.String(), nullable=False),
+    sa.Column('job_number', sa.String(), nullable=False),
+    sa.Column('nationality', sa.String(), nullable=False),
+    sa.Column('phone', sa.String(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_company_employees_id'), 'company_employees', ['id'], unique=False)
+    op.create_index(op.f('ix_company_employees_national_id'), 'company_employees', ['national_id'], unique=True)
+    op.create_table('service_providers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('code', sa.String(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_service_providers_id'), 'service_providers', ['id'], unique=False)
+    op.create_table('suspended_beneficiaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('beneficiary_id', sa.Integer(), nullable=False),
+    sa.Column('suspended_at', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['beneficiary_id'], ['beneficiaries.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_suspended_beneficiaries_id'), 'suspended_beneficiaries', ['id'], unique=False)
+    op.create_table('employee_service_provider',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('provider_id', sa.Integer(), nullable=False),
+    sa.Column('assigned_at', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['company_employees.id'], ),
+    sa.ForeignKeyConstraint(['provider_id'], ['service_providers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_employee_service_provider_id'), 'employee_service_provider', ['id'], unique=False)
+    op.create_table('suspended_employees',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('suspended_at', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['company_employees.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_suspended_employees_id'), 'suspended_employees', ['id'], unique=False)
+
+
+def downgrade():
+    # dropping a table drops its indexes too
+    op.drop_table('suspended_employees')
+    op.drop_table('employee_service_provider')
+    op.drop_table('suspended_beneficiaries')
+    op.drop_table('service_providers')
+    op.drop_table('company_employees')
+    op.drop_table('companies')
+    op.drop_table('beneficiaries')
+    sa.Enum(name='company_type').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,98 @@
+"""search indexes and change tracking
+
+Everything the schema gained on top of the original create_all() baseline
+(0001) before the migrations took over:
+
+- pg_trgm and the trigram / text_pattern_ops indexes search.py relies on
+- ix_suspended_beneficiaries_suspended_at_id for the suspended list order
+- table_versions, bumped by a statement trigger on every tracked table, which
+  the ETags (conditional.py) and the suspension index (suspensions.py) read
+
+Every step is IF NOT EXISTS / OR REPLACE, so it also runs cleanly on a database
+that already has some of it. The indexes are built CONCURRENTLY, as in 0002.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-18 09:30:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+TRACKED_TABLES = [
+    "beneficiaries", "suspended_beneficiaries", "companies", "company_employees",
+    "suspended_employees", "service_providers", "employee_service_provider",
+]
+
+BUMP_VERSION_FUNCTION = """
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# (name, table, column): GIN gin_trgm_ops for icontains, text_pattern_ops for startswith
+TRGM_INDEXES = [
+    ("ix_trgm_beneficiaries_name", "beneficiaries", "name"),
+    ("ix_trgm_beneficiaries_national_id", "beneficiaries", "national_id"),
+    ("ix_trgm_beneficiaries_phone", "beneficiaries", "phone"),
+    ("ix_trgm_companies_commercial_number", "companies", "commercial_number"),
+    ("ix_trgm_companies_name", "companies", "name"),
+    ("ix_trgm_companies_unified_number", "companies", "unified_number"),
+    ("ix_trgm_company_employees_job_number", "company_employees", "job_number"),
+    ("ix_trgm_company_employees_name", "company_employees", "name"),
+    ("ix_trgm_company_employees_national_id", "company_employees", "national_id"),
+]
+PREFIX_INDEXES = [
+    ("ix_prefix_beneficiaries_national_id", "beneficiaries", "national_id"),
+    ("ix_prefix_beneficiaries_phone", "beneficiaries", "phone"),
+    ("ix_prefix_company_employees_job_number", "company_employees", "job_number"),
+    ("ix_prefix_company_employees_national_id", "company_employees", "national_id"),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE TABLE IF NOT EXISTS table_versions ("
+        "table_name VARCHAR NOT NULL, version BIGINT NOT NULL, PRIMARY KEY (table_name))"
+    )
+    op.execute(BUMP_VERSION_FUNCTION)
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+        op.execute(
+            f"CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+        )
+
+    with op.get_context().autocommit_block():
+        for name, table, column in TRGM_INDEXES:
+            op.create_index(name, table, [column], postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'},
+                            postgresql_concurrently=True, if_not_exists=True)
+        for name, table, column in PREFIX_INDEXES:
+            op.create_index(name, table, [column], postgresql_ops={column: 'text_pattern_ops'},
+                            postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_suspended_beneficiaries_suspended_at_id', 'suspended_beneficiaries', ['suspended_at', 'id'],
+                        postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_suspended_beneficiaries_suspended_at_id', table_name='suspended_beneficiaries',
+                      postgresql_concurrently=True, if_exists=True)
+        for name, table, column in reversed(TRGM_INDEXES + PREFIX_INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+    for table in TRACKED_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_version()")
+    op.drop_table('table_versions')
+    # pg_trgm stays: other objects in the database may use it
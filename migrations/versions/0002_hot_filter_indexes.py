@@ -0,0 +1,40 @@
+"""indexes for the hot filter and join columns
+
+Built with CREATE INDEX CONCURRENTLY so a live database keeps accepting writes.
+That cannot run inside a transaction, hence the autocommit block; IF NOT EXISTS
+makes a re-run after an interrupted build a no-op (drop an INVALID leftover first).
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-18 09:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_companies_type_id", "companies", ["type", "id"]),
+    ("ix_companies_unified_number", "companies", ["unified_number"]),
+    ("ix_company_employees_company_id_id", "company_employees", ["company_id", "id"]),
+    ("ix_suspended_employees_employee_id", "suspended_employees", ["employee_id"]),
+    ("ix_suspended_beneficiaries_beneficiary_id_suspended_at", "suspended_beneficiaries", ["beneficiary_id", "suspended_at"]),
+    ("ix_employee_service_provider_employee_id_provider_id", "employee_service_provider", ["employee_id", "provider_id"]),
+    ("ix_employee_service_provider_provider_id", "employee_service_provider", ["provider_id"]),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,64 @@
+"""materialized suspension summaries for /stats
+
+Small pre-aggregated views so dashboard counts don't scan the suspension
+tables. stats.py refreshes them (CONCURRENTLY, hence the unique indexes)
+whenever the source tables' change versions move.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:05:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+VIEWS = {
+    # one row per company with at least one suspension
+    "stats_suspended_employees_by_company": (
+        """
+        SELECT c.id AS company_id, c.name AS company_name, c.type::text AS company_type, count(*) AS suspended
+        FROM suspended_employees s
+        JOIN company_employees e ON e.id = s.employee_id
+        JOIN companies c ON c.id = e.company_id
+        GROUP BY c.id, c.name, c.type
+        """,
+        "company_id",
+    ),
+    # one row per day with suspensions of either kind
+    "stats_suspensions_by_day": (
+        """
+        SELECT day, coalesce(e.n, 0) AS employees, coalesce(b.n, 0) AS beneficiaries
+        FROM (SELECT suspended_at AS day, count(*) AS n FROM suspended_employees GROUP BY suspended_at) e
+        FULL JOIN (SELECT suspended_at AS day, count(*) AS n FROM suspended_beneficiaries GROUP BY suspended_at) b
+        USING (day)
+        """,
+        "day",
+    ),
+    # suspensions of employees assigned to each provider (an employee counts once per provider)
+    "stats_suspended_employees_by_provider": (
+        """
+        SELECT p.id AS provider_id, p.name AS provider_name, count(DISTINCT s.id) AS suspended
+        FROM suspended_employees s
+        JOIN employee_service_provider a ON a.employee_id = s.employee_id
+        JOIN service_providers p ON p.id = a.provider_id
+        GROUP BY p.id, p.name
+        """,
+        "provider_id",
+    ),
+}
+
+
+def upgrade():
+    for name, (query, key) in VIEWS.items():
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+        op.execute(f"CREATE UNIQUE INDEX ix_{name}_{key} ON {name} ({key})")
+
+
+def downgrade():
+    for name in reversed(list(VIEWS)):
+        op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {name}")
@@ -0,0 +1,46 @@
+"""(field, id) indexes for the ?sort= orders of the list endpoints
+
+Each sortable field gets an index ending in id, the tie-breaker every sorted
+page uses (see listing.py), so a sorted page is an index scan. The new
+(employee_id, id) index covers what ix_suspended_employees_employee_id served,
+so that one is dropped. Built CONCURRENTLY, as in 0002.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 13:20:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_company_employees_name_id", "company_employees", ["name", "id"]),
+    ("ix_suspended_employees_employee_id_id", "suspended_employees", ["employee_id", "id"]),
+    ("ix_suspended_employees_suspended_at_id", "suspended_employees", ["suspended_at", "id"]),
+    ("ix_companies_type_name_id", "companies", ["type", "name", "id"]),
+    ("ix_beneficiaries_name_id", "beneficiaries", ["name", "id"]),
+]
+REPLACED = [
+    ("ix_suspended_employees_employee_id", "suspended_employees", ["employee_id"]),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in REPLACED:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in REPLACED:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,125 @@
+"""monthly range partitions for the suspension and assignment history tables
+
+suspended_employees and suspended_beneficiaries (on suspended_at) and
+employee_service_provider (on assigned_at) only ever grow, and reads mostly
+want recent dates. Each becomes a table partitioned by month, so a date range
+filter only scans the months it covers and old months can be detached and
+archived whole (partitions.py). A DEFAULT partition takes rows no monthly
+partition covers; `python partitions.py maintain` moves them into their month.
+
+The primary key has to include the partition key, so it becomes
+(id, suspended_at) / (id, assigned_at); id stays unique through its sequence
+and is still what the app looks rows up by. The separate ix_<table>_id indexes
+go, the primary key leads with id. Other indexes, foreign keys, the
+table_versions trigger and the id sequence are carried over, and the stats
+materialized views (0003), which read these tables, are dropped and rebuilt
+from their stored definitions.
+
+Each table is rewritten under an exclusive lock: run it in a maintenance window.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:40:00.000000
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+# table -> partition key
+PARTITIONED = {
+    "suspended_employees": "suspended_at",
+    "suspended_beneficiaries": "suspended_at",
+    "employee_service_provider": "assigned_at",
+}
+MONTHS_AHEAD = 3  # empty partitions created past the current month
+
+
+def add_months(day, months):
+    month = day.year * 12 + day.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def drop_materialized_views(conn):
+    # definition and index DDL of every materialized view, to create them again afterwards
+    views = conn.execute(sa.text("SELECT matviewname, definition FROM pg_matviews WHERE schemaname = current_schema()")).all()
+    saved = []
+    for name, definition in views:
+        indexes = conn.scalars(sa.text("SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :name"), {"name": name}).all()
+        saved.append((name, definition, indexes))
+        op.execute(f"DROP MATERIALIZED VIEW {name}")
+    return saved
+
+
+def create_materialized_views(saved):
+    for name, definition, indexes in saved:
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {definition}")
+        for index in indexes:
+            op.execute(index)
+
+
+def rebuild(conn, table, key, partitioned):
+    # copy `table` into a new one with the same columns: partitioned by month on `key`, or plain
+    old = f"{table}_old"
+    sequence = conn.scalar(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table})
+    indexes = conn.scalars(sa.text(
+        "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table "
+        "AND indexname NOT IN (:pkey, :id_index)"
+    ), {"table": table, "pkey": f"{table}_pkey", "id_index": f"ix_{table}_id"}).all()
+    foreign_keys = conn.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+    ), {"table": table}).all()
+
+    op.execute(f"ALTER TABLE {table} RENAME TO {old}")
+    op.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)" + (f" PARTITION BY RANGE ({key})" if partitioned else ""))
+    if partitioned:
+        first = conn.scalar(sa.text(f"SELECT min({key}) FROM {old}")) or date.today()
+        month, last = add_months(first, 0), add_months(date.today(), MONTHS_AHEAD)
+        while month <= last:
+            op.execute(
+                f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+                f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"
+            )
+            month = add_months(month, 1)
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {old}")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id")
+    op.execute(f"DROP TABLE {old}")  # its indexes, constraints and trigger go with it
+
+    # built after the copy, on the parent: partitioned indexes cascade to every partition
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, {key})" if partitioned
+               else f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+    if not partitioned:
+        op.execute(f"CREATE INDEX ix_{table}_id ON {table} (id)")
+    for name, definition in foreign_keys:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+    for index in indexes:
+        op.execute(index)
+    op.execute(
+        f"CREATE TRIGGER {table}_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()"
+    )
+    op.execute(f"ANALYZE {table}")
+
+
+def upgrade():
+    conn = op.get_bind()
+    views = drop_materialized_views(conn)
+    for table, key in PARTITIONED.items():
+        rebuild(conn, table, key, partitioned=True)
+    create_materialized_views(views)
+
+
+def downgrade():
+    # archived months (partitions.py archive) are not brought back; restore them first if needed
+    conn = op.get_bind()
+    views = drop_materialized_views(conn)
+    for table, key in PARTITIONED.items():
+        rebuild(conn, table, key, partitioned=False)
+    create_materialized_views(views)
@@ -0,0 +1,50 @@
+"""versions for updates and deletes of the suspension tables
+
+The suspension index (suspensions.py) follows inserts by id and only needs a
+full rebuild when rows of suspended_employees / suspended_beneficiaries change
+or go away. table_versions moves on every write, so these tables get a second
+statement trigger, for UPDATE, DELETE and TRUNCATE only, bumping
+"<table>:rewrite" in table_versions.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 18:10:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+TABLES = ["suspended_employees", "suspended_beneficiaries"]
+
+# ":" escaped, op.execute() would take ":rewrite" for a bind parameter
+BUMP_REWRITE_FUNCTION = r"""
+CREATE OR REPLACE FUNCTION bump_table_rewrite() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME || '\:rewrite', 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def upgrade():
+    op.execute(BUMP_REWRITE_FUNCTION)
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_rewrite ON {table}")
+        op.execute(
+            f"CREATE TRIGGER {table}_rewrite AFTER UPDATE OR DELETE OR TRUNCATE ON {table} "
+            f"FOR EACH STATEMENT EXECUTE FUNCTION bump_table_rewrite()"
+        )
+
+
+def downgrade():
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_rewrite ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS bump_table_rewrite()")
+    op.execute(r"DELETE FROM table_versions WHERE table_name LIKE '%\:rewrite'")
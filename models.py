@@ -1,10 +1,35 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, Date, Enum, Index
 from sqlalchemy.orm import relationship
-from database import Base
+from database import Base, engine
 from datetime import date
 import enum
 
 
+# The schema itself is managed by migrations (alembic upgrade head, see migrations/);
+# indexes declared here are what autogenerate compares against.
+
+# Search indexes (see search.py): trigram GIN indexes serve ILIKE '%term%',
+# text_pattern_ops btree indexes serve the LIKE 'term%' prefix fast path.
+def trgm_index(table, column):
+    return Index(f"ix_trgm_{table}_{column}", column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+
+
+def prefix_index(table, column):
+    return Index(f"ix_prefix_{table}_{column}", column, postgresql_ops={column: "text_pattern_ops"})
+
+
+# History tables are range partitioned by month on their date column (migration
+# 0005, partitions.py). On Postgres the primary key has to include that column,
+# so it is (id, date); other databases (the SQLite stand-in) keep id alone, which
+# is also all SQLite can autoincrement. The mapper identifies rows by id either
+# way (db.get(Model, id)).
+PARTITION_KEY_IN_PRIMARY_KEY = engine.dialect.name == "postgresql"
+
+
+def monthly_partitions(column):
+    return {"postgresql_partition_by": f"RANGE ({column})"}
+
+
 class CompanyTypeEnum(enum.Enum):
     sales = "sales"
     installation = "installation"
@@ -12,6 +37,15 @@ class CompanyTypeEnum(enum.Enum):
 
 class Beneficiary(Base):
     __tablename__ = "beneficiaries"
+    __table_args__ = (
+        trgm_index("beneficiaries", "name"),
+        trgm_index("beneficiaries", "national_id"),
+        trgm_index("beneficiaries", "phone"),
+        prefix_index("beneficiaries", "national_id"),
+        prefix_index("beneficiaries", "phone"),
+        # ?sort=name, with the id tie-breaker (see listing.py)
+        Index("ix_beneficiaries_name_id", "name", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
@@ -27,10 +61,18 @@ class Beneficiary(Base):
 
 class SuspendedBeneficiary(Base):
     __tablename__ = "suspended_beneficiaries"
-
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        # default list order (suspended_at DESC, id DESC), walked by the keyset cursor
+        Index("ix_suspended_beneficiaries_suspended_at_id", "suspended_at", "id"),
+        # a beneficiary's suspensions (selectin loads, latest suspension lookups)
+        Index("ix_suspended_beneficiaries_beneficiary_id_suspended_at", "beneficiary_id", "suspended_at"),
+        monthly_partitions("suspended_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
     beneficiary_id = Column(Integer, ForeignKey("beneficiaries.id"), nullable=False)
-    suspended_at = Column(Date, default=date.today, nullable=False)
+    suspended_at = Column(Date, primary_key=PARTITION_KEY_IN_PRIMARY_KEY, default=date.today, nullable=False)
+    __mapper_args__ = {"primary_key": [id]}
 
     beneficiary = relationship("Beneficiary", back_populates="suspended")
 
@@ -40,6 +82,16 @@ class SuspendedBeneficiary(Base):
 
 class Company(Base):
     __tablename__ = "companies"
+    __table_args__ = (
+        trgm_index("companies", "name"),
+        trgm_index("companies", "commercial_number"),
+        trgm_index("companies", "unified_number"),
+        # list_companies: WHERE type = ? ORDER BY id, and ?sort=name
+        Index("ix_companies_type_id", "type", "id"),
+        Index("ix_companies_type_name_id", "type", "name", "id"),
+        # get_company: WHERE unified_number = ?
+        Index("ix_companies_unified_number", "unified_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
@@ -56,6 +108,17 @@ class Company(Base):
 
 class CompanyEmployee(Base):
     __tablename__ = "company_employees"
+    __table_args__ = (
+        trgm_index("company_employees", "name"),
+        trgm_index("company_employees", "national_id"),
+        trgm_index("company_employees", "job_number"),
+        prefix_index("company_employees", "national_id"),
+        prefix_index("company_employees", "job_number"),
+        # ?company_id= filter, ordered by id, ?sort=company_id, and Company.employees loads
+        Index("ix_company_employees_company_id_id", "company_id", "id"),
+        # ?sort=name
+        Index("ix_company_employees_name_id", "name", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
@@ -75,10 +138,18 @@ class CompanyEmployee(Base):
 
 class SuspendedEmployee(Base):
     __tablename__ = "suspended_employees"
-
-    id = Column(Integer, primary_key=True, index=True)
+    __table_args__ = (
+        # an employee's suspensions, and ?sort=employee_id
+        Index("ix_suspended_employees_employee_id_id", "employee_id", "id"),
+        # ?sort=suspended_at
+        Index("ix_suspended_employees_suspended_at_id", "suspended_at", "id"),
+        monthly_partitions("suspended_at"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
     employee_id = Column(Integer, ForeignKey("company_employees.id"), nullable=False)
-    suspended_at = Column(Date, default=date.today, nullable=False)
+    suspended_at = Column(Date, primary_key=PARTITION_KEY_IN_PRIMARY_KEY, default=date.today, nullable=False)
+    __mapper_args__ = {"primary_key": [id]}
 
     employee = relationship("CompanyEmployee", back_populates="suspended")
 
@@ -103,14 +174,31 @@ class ServiceProvider(Base):
 
 class EmployeeServiceProvider(Base):
     __tablename__ = "employee_service_provider"
+    __table_args__ = (
+        Index("ix_employee_service_provider_employee_id_provider_id", "employee_id", "provider_id"),
+        Index("ix_employee_service_provider_provider_id", "provider_id"),
+        monthly_partitions("assigned_at"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     employee_id = Column(Integer, ForeignKey("company_employees.id"), nullable=False)
     provider_id = Column(Integer, ForeignKey("service_providers.id"), nullable=False)
-    assigned_at = Column(Date, default=date.today, nullable=False)
+    assigned_at = Column(Date, primary_key=PARTITION_KEY_IN_PRIMARY_KEY, default=date.today, nullable=False)
+    __mapper_args__ = {"primary_key": [id]}
 
     employee = relationship("CompanyEmployee", back_populates="services")
     provider = relationship("ServiceProvider", back_populates="assigned_employees")
 
     def __repr__(self):
         return f"<EmployeeServiceProvider(id={self.id}, employee_id={self.employee_id}, provider_id={self.provider_id})>"
+
+
+# === Change tracking ===
+# One row per table, bumped by a statement-level trigger on every write
+# (created in migrations/versions/0001a_search_indexes_change_tracking.py).
+# conditional.py builds ETags from these versions.
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
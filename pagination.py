@@ -0,0 +1,141 @@
+# Keyset (cursor) pagination and totals shared by the list endpoints.
+#
+# Each endpoint declares its sort keys, e.g. (suspended_at DESC, id DESC).
+# The page query selects those key values next to the entity, fetches one
+# extra row to know whether there is a next page, and the last row's keys are
+# encoded into an opaque `next_cursor`. Passing that cursor back continues
+# with WHERE (keys) < (last keys) instead of OFFSET, so deep pages cost the
+# same as the first one. `skip` still works when no cursor is given. The
+# cursor also records the requested sort: its values only mean something in
+# that order, so a cursor passed back with another ?sort= is a 400.
+#
+# The total is computed according to TotalMode:
+#   exact    - COUNT(*) OVER () in the page query itself, then carried in the
+#              cursor so later pages don't count again
+#   estimate - the planner's row estimate from EXPLAIN, nothing is executed
+#   none     - no total, only has_more
+import base64
+import json
+from datetime import date
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Date, Numeric, and_, func, or_, select, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from schemas import TotalMode
+
+
+class SortKey(NamedTuple):
+    expr: object
+    desc: bool = False
+
+
+def encode_cursor(values, total: Optional[int] = None, sort: Optional[str] = None) -> str:
+    keys = [v.isoformat() if isinstance(v, date) else str(v) if isinstance(v, Decimal) else v for v in values]
+    raw = json.dumps({"k": keys, "t": total, "s": sort})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys, sort: Optional[str] = None):
+    # returns (sort key values, total carried from the first page or None)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values, total, cursor_sort = payload["k"], payload.get("t"), payload.get("s")
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        values = [_coerce(value, key.expr.type) for value, key in zip(values, keys)]
+    except (ValueError, TypeError, KeyError, AttributeError, ArithmeticError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort. Repeat its sort or start without a cursor.")
+    return values, total
+
+
+def _coerce(value, type_):
+    if isinstance(type_, Date):
+        return date.fromisoformat(value)
+    if isinstance(type_, Numeric):
+        return Decimal(value)
+    return value
+
+
+def _after(keys, values):
+    # all keys in one direction: a row comparison Postgres can serve from an index
+    if all(k.desc == keys[0].desc for k in keys):
+        row, last = tuple_(*(k.expr for k in keys)), tuple_(*values)
+        return row < last if keys[0].desc else row > last
+    clauses = []
+    for i, key in enumerate(keys):
+        step = key.expr < values[i] if key.desc else key.expr > values[i]
+        clauses.append(and_(*(k.expr == v for k, v in zip(keys[:i], values[:i])), step))
+    return or_(*clauses)
+
+
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def count_rows(db, query):
+    return await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+
+async def estimate_rows(db, query):
+    # planner estimate for the filtered query; falls back to an exact count off Postgres
+    if db.bind.dialect.name != "postgresql":
+        return await count_rows(db, query)
+    plan = await db.scalar(_Explain(query.order_by(None)))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def fetch_page(db, query, keys, limit: int, skip: int = 0, cursor: Optional[str] = None,
+                     total: TotalMode = TotalMode.exact, sort: Optional[str] = None):
+    # sort: the request's ?sort= as given, recorded in the cursor
+    values, carried_total = decode_cursor(cursor, keys, sort) if cursor else (None, None)
+    count_in_query = total == TotalMode.exact and values is None
+    # one entity per row, or plain column tuples (serialization.py fast mode)
+    width = len(query.column_descriptions)
+
+    page = query.add_columns(*(k.expr for k in keys))
+    if count_in_query:
+        page = page.add_columns(func.count().over())
+    page = page.order_by(*(k.expr.desc() if k.desc else k.expr.asc() for k in keys))
+    if values is not None:
+        page = page.filter(_after(keys, values))
+    elif skip:
+        page = page.offset(skip)
+    rows = (await db.execute(page.limit(limit + 1))).all()
+
+    if total == TotalMode.none:
+        count = None
+    elif total == TotalMode.estimate:
+        count = await estimate_rows(db, query)
+    elif carried_total is not None:
+        count = carried_total
+    elif count_in_query and rows:
+        count = rows[0][-1]
+    elif count_in_query and not skip:
+        count = 0
+    else:
+        # skipped past the last row, or a cursor that carries no total
+        count = await count_rows(db, query)
+
+    has_more = len(rows) > limit
+    next_cursor = None
+    if has_more and limit > 0:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last[width:width + len(keys)], count if total == TotalMode.exact else None, sort)
+    data = [row[0] for row in rows[:limit]] if width == 1 else [row[:width] for row in rows[:limit]]
+    return {"data": data, "total": count, "has_more": has_more, "next_cursor": next_cursor}
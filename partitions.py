@@ -0,0 +1,199 @@
+# Monthly partitions of the history tables, and archival of old months.
+#
+# suspended_employees, suspended_beneficiaries (on suspended_at) and
+# employee_service_provider (on assigned_at) are range partitioned by month
+# (migration 0005). A list request with ?since= / ?until= only scans the months
+# in that range, and old months leave the tables whole, without a DELETE.
+#
+#   python partitions.py maintain     # from cron, at least monthly
+#   python partitions.py archive      # months older than ARCHIVE_AFTER_MONTHS
+#   python partitions.py restore archive/suspended_employees/suspended_employees_p2021_01.csv.gz
+#
+# maintain creates the partitions for the next PARTITION_MONTHS_AHEAD months,
+# and moves rows that landed in a DEFAULT partition (a date no monthly
+# partition covered yet, e.g. after bench.seed or a restore) into a partition
+# of their own month.
+#
+# archive writes each partition whose month ended before the cutoff to
+# ARCHIVE_DIR/<table>/<partition>.csv.gz (CSV with a header, gzip), and only
+# once the file is on disk detaches and drops it. DETACH fires no triggers, so
+# the table's versions are bumped here: ETags and /stats move on, and the
+# suspension index rebuilds without the rows (suspensions.py).
+# restore loads a file back through the parent table (rows already present are
+# skipped); the next archive run archives that month again if it is still old.
+import argparse
+import gzip
+import os
+import re
+from datetime import date
+
+from sqlalchemy import text
+
+from database import engine
+
+# table -> partition key
+PARTITIONED = {
+    "suspended_employees": "suspended_at",
+    "suspended_beneficiaries": "suspended_at",
+    "employee_service_provider": "assigned_at",
+}
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "24"))
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+
+PARTITION_NAME = re.compile(r"(\w+)_(p\d{4}_\d{2}|default)")
+BOUNDS = re.compile(r"FROM \('([\d-]+)'\) TO \('([\d-]+)'\)")
+
+
+def is_partition(name):
+    match = PARTITION_NAME.fullmatch(name)
+    return match is not None and match.group(1) in PARTITIONED
+
+
+def add_months(day, months):
+    # first day of the month `months` after day's month
+    month = day.year * 12 + day.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y_%m}"
+
+
+def monthly_partitions(conn, table):
+    # {first day of the month: partition name}
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": table})
+    partitions = {}
+    for name, bound in rows:
+        match = BOUNDS.search(bound)
+        if match:  # the DEFAULT partition has no bounds
+            partitions[date.fromisoformat(match.group(1))] = name
+    return partitions
+
+
+def create_partition(conn, table, month):
+    # rows of that month waiting in the DEFAULT partition move into it before it is attached
+    name, key, end = partition_name(table, month), PARTITIONED[table], add_months(month, 1)
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+    moved = conn.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE {key} >= :month AND {key} < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"month": month, "end": end}).rowcount
+    # the primary key, indexes and foreign keys are cloned from the parent
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{month}') TO ('{end}')"))
+    return name, moved
+
+
+def maintain(conn, table):
+    key = PARTITIONED[table]
+    waiting = conn.scalars(text(f"SELECT DISTINCT CAST(date_trunc('month', {key}) AS date) FROM {table}_default")).all()
+    ahead = {add_months(date.today(), n) for n in range(PARTITION_MONTHS_AHEAD + 1)}
+    missing = (set(waiting) | ahead) - monthly_partitions(conn, table).keys()
+    return [create_partition(conn, table, month) for month in sorted(missing)]
+
+
+def bump_version(conn, table):
+    # what bump_table_version() (migration 0001a) and, for rows going away,
+    # bump_table_rewrite() (migration 0006) do for writes that go through the table
+    for key in (table, f"{table}:rewrite"):
+        conn.execute(text(
+            "INSERT INTO table_versions (table_name, version) VALUES (:table, 1) "
+            "ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1"
+        ), {"table": key})
+
+
+def archive_path(table, name):
+    directory = os.path.join(ARCHIVE_DIR, table)
+    os.makedirs(directory, exist_ok=True)
+    path, n = os.path.join(directory, f"{name}.csv.gz"), 1
+    while os.path.exists(path):  # the month was archived before, then restored or backdated into
+        n += 1
+        path = os.path.join(directory, f"{name}.{n}.csv.gz")
+    return path
+
+
+def write_archive(conn, name, path):
+    # into a .partial file first, so an interrupted run never leaves a truncated archive
+    partial = f"{path}.partial"
+    cursor = conn.connection.cursor()
+    with open(partial, "wb") as file:
+        with gzip.GzipFile(fileobj=file, mode="wb") as out:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", out)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(partial, path)
+    return cursor.rowcount
+
+
+def archive(table, before):
+    # archives the months that ended on or before `before`, oldest first: [(partition, rows, path)]
+    with engine.connect() as conn:
+        partitions = sorted(monthly_partitions(conn, table).items())
+    archived = []
+    for month, name in partitions:
+        if add_months(month, 1) > before:
+            break
+        path = archive_path(table, name)
+        # the copy reads a snapshot while the partition is still attached: nothing is blocked meanwhile
+        with engine.begin() as conn:
+            rows = write_archive(conn, name, path)
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            # a row written into that month during the copy is not in the file: leave the month for the next run
+            if conn.scalar(text(f"SELECT count(*) FROM {name}")) != rows:
+                conn.rollback()
+                os.remove(path)
+                continue
+            conn.execute(text(f"DROP TABLE {name}"))
+            bump_version(conn, table)
+        archived.append((name, rows, path))
+    return archived
+
+
+def restore(path):
+    match = PARTITION_NAME.fullmatch(os.path.basename(path).split(".")[0])
+    if match is None or match.group(1) not in PARTITIONED:
+        raise ValueError(f"{path}: not an archive written by partitions.py archive")
+    table = match.group(1)
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TEMPORARY TABLE restored (LIKE {table}) ON COMMIT DROP"))
+        with gzip.open(path, "rb") as source:
+            conn.connection.cursor().copy_expert("COPY restored FROM STDIN WITH (FORMAT csv, HEADER)", source)
+        rows = conn.execute(text(f"INSERT INTO {table} SELECT * FROM restored ON CONFLICT DO NOTHING")).rowcount
+        maintain(conn, table)  # out of the DEFAULT partition, into the month's own
+    return table, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain and archive the monthly partitions of the history tables")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("maintain", help="create upcoming months, split rows out of the DEFAULT partitions")
+    archive_parser = commands.add_parser("archive", help="write old months to ARCHIVE_DIR, then drop them")
+    archive_parser.add_argument("--before", type=date.fromisoformat,
+                                help=f"archive the months ending on or before this day (default: {ARCHIVE_AFTER_MONTHS} months ago)")
+    restore_parser = commands.add_parser("restore", help="load archived months back")
+    restore_parser.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "maintain":
+        for table in PARTITIONED:
+            with engine.begin() as conn:
+                for name, moved in maintain(conn, table):
+                    print(f"{name:<40} created, {moved} rows from the default partition", flush=True)
+    elif args.command == "archive":
+        before = args.before or add_months(date.today(), -ARCHIVE_AFTER_MONTHS)
+        for table in PARTITIONED:
+            for name, rows, path in archive(table, before):
+                print(f"{name:<40}{rows:>10} rows  {path}", flush=True)
+    else:
+        for path in args.files:
+            table, rows = restore(path)
+            print(f"{table:<40}{rows:>10} rows  {path}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
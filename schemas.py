@@ -1,6 +1,14 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import date
 from typing import Optional
+import enum
+
+
+# === List totals ===
+class TotalMode(str, enum.Enum):
+    exact = "exact"        # counted in the page query (COUNT(*) OVER ())
+    estimate = "estimate"  # planner row estimate, no count is executed
+    none = "none"          # no total; use has_more / next_cursor
 
 
 # === Beneficiary ===
@@ -39,7 +47,9 @@ class SuspendedBeneficiaryWithBeneficiaryOut(SuspendedBeneficiaryOut):
 
 class SuspendedBeneficiaryListResponse(BaseModel):
     data: list[SuspendedBeneficiaryWithBeneficiaryOut]
-    total: int
+    total: Optional[int]
+    has_more: bool = False
+    next_cursor: Optional[str] = None  # pass back as ?cursor= to get the next page
 # === Company ===
 class CompanyBase(BaseModel):
     name: str
@@ -58,7 +68,9 @@ class CompanyOut(CompanyBase):
 
 class CompanyListResponse(BaseModel):
     data: list[CompanyOut]
-    total: int
+    total: Optional[int]
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 # === Company Employee ===
@@ -81,7 +93,9 @@ class CompanyEmployeeOut(CompanyEmployeeBase):
 # === Employee List Response ===
 class EmployeeListResponse(BaseModel):
     data: list[CompanyEmployeeOut]
-    total: int
+    total: Optional[int]
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 # === Suspended Employee ===
 class SuspendedEmployeeCreate(BaseModel):
@@ -117,7 +131,9 @@ class SuspendedEmployeeOut(BaseModel):
 # === Suspended Employee List Response ===
 class SuspendedEmployeeListResponse(BaseModel):
     data: list[SuspendedEmployeeOut]
-    total: int
+    total: Optional[int]
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 
 # === Service Provider ===
@@ -146,6 +162,107 @@ class EmployeeServiceProviderOut(EmployeeServiceProviderCreate):
     class Config:
         from_attributes = True
 
+
+# === Batch lookups (POST /…/lookup, see lookup.py) ===
+LOOKUP_MAX_KEYS = 1000
+
+class LookupRequest(BaseModel):
+    keys: list[str] = Field(..., max_length=LOOKUP_MAX_KEYS)
+
+    class Config:
+        coerce_numbers_to_str = True  # ids may be sent as numbers
+
+class EmployeeLookupKey(str, enum.Enum):
+    id = "id"
+    national_id = "national_id"
+
+class BeneficiaryLookupOut(BeneficiaryOut):
+    suspended: bool
+    suspended_at: Optional[date]  # latest suspension
+
+class BeneficiaryLookupResult(BaseModel):
+    found: dict[str, BeneficiaryLookupOut]  # keyed by the requested key
+    missing: list[str]
+
+class CompanyEmployeeLookupOut(CompanyEmployeeOut):
+    suspended: bool
+    suspended_at: Optional[date]  # latest suspension
+
+class CompanyEmployeeLookupResult(BaseModel):
+    found: dict[str, CompanyEmployeeLookupOut]
+    missing: list[str]
+
+class CompanyLookupOut(CompanyOut):
+    suspended_employees: int
+
+class CompanyLookupResult(BaseModel):
+    found: dict[str, CompanyLookupOut]
+    missing: list[str]
+
+class SuspendedBeneficiaryLookupResult(BaseModel):
+    found: dict[str, SuspendedBeneficiaryWithBeneficiaryOut]
+    missing: list[str]
+
+
+# === Suspension check (see suspensions.py) ===
+class SuspensionCheckOut(BaseModel):
+    national_id: str
+    suspended: bool
+    employee: bool     # has a row in suspended_employees
+    beneficiary: bool  # has a row in suspended_beneficiaries
+
+
+# === Stats (dashboard counts, see stats.py) ===
+class CompanyTypeSuspensions(BaseModel):
+    company_type: str
+    suspended: int
+
+class CompanySuspensions(BaseModel):
+    company_id: int
+    company_name: str
+    company_type: str
+    suspended: int
+
+class DaySuspensions(BaseModel):
+    day: date
+    employees: int
+    beneficiaries: int
+
+class ServiceProviderSuspensions(BaseModel):
+    provider_id: int
+    provider_name: str
+    suspended: int
+
+class StatsOut(BaseModel):
+    suspended_employees: int
+    suspended_beneficiaries: int
+    by_company_type: list[CompanyTypeSuspensions]
+    by_company: list[CompanySuspensions]
+    by_day: list[DaySuspensions]
+    by_service_provider: list[ServiceProviderSuspensions]
+
+
+# === Export ===
+class ExportFormat(str, enum.Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+# === Bulk ingestion ===
+class BulkMethod(str, enum.Enum):
+    insert = "insert"  # multi-row INSERT ... RETURNING, returns ids
+    copy = "copy"      # Postgres COPY, fastest, no ids
+
+class BulkItemError(BaseModel):
+    index: int  # position of the item in the uploaded array / file
+    error: str
+
+class BulkResult(BaseModel):
+    inserted: int
+    failed: int
+    ids: list[int]  # ids of the inserted rows in input order (empty for method=copy)
+    errors: list[BulkItemError]
+
 # class CompanySimpleOut(BaseModel):
 #     id: int
 #     name: str
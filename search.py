@@ -0,0 +1,83 @@
+# Search helpers for the list endpoints.
+#
+# A term is matched as a case-insensitive substring (ILIKE '%term%') of the
+# text and key columns, which Postgres serves from the pg_trgm GIN indexes
+# declared in models.py. Identifier-looking terms (contain a digit, no spaces)
+# first try the prefix fast path: LIKE 'term%' on the key columns (national_id,
+# job_number, ...), served by the text_pattern_ops btree indexes. When some
+# row starts with the term, only those rows match; the substring match runs
+# only when none does. Results are ranked: exact key matches
+# first, then by trigram similarity. The rank is returned as sort keys so the
+# caller can page through ranked results with a cursor (see pagination.py).
+import re
+from typing import NamedTuple, Optional
+
+from sqlalchemy import Numeric, case, cast, func, or_, select
+from sqlalchemy.orm import InstrumentedAttribute
+
+import models
+from lookup import int_key
+from pagination import SortKey
+
+
+class SearchFields(NamedTuple):
+    text: tuple                       # substring match + similarity ranking
+    keys: tuple = ()                  # prefix match for identifier-like terms
+    id: Optional[InstrumentedAttribute] = None  # exact match for all-digit terms
+
+
+EMPLOYEE_SEARCH = SearchFields(
+    text=(models.CompanyEmployee.name,),
+    keys=(models.CompanyEmployee.national_id, models.CompanyEmployee.job_number),
+)
+
+COMPANY_SEARCH = SearchFields(
+    text=(models.Company.name,),
+    keys=(models.Company.commercial_number, models.Company.unified_number),
+)
+
+SUSPENDED_BENEFICIARY_SEARCH = SearchFields(
+    text=(models.Beneficiary.name,),
+    keys=(models.Beneficiary.national_id, models.Beneficiary.phone),
+    id=models.SuspendedBeneficiary.beneficiary_id,
+)
+
+KEY_TERM = re.compile(r"^(?=.*\d)[\w-]+$")
+
+
+def _id_match(fields: SearchFields, term: str):
+    return [fields.id == int_key(term)] if fields.id is not None and int_key(term) is not None else []
+
+
+def prefix_condition(fields: SearchFields, term: str):
+    # the fast path for identifier-like terms, or None
+    if not fields.keys or not KEY_TERM.match(term):
+        return None
+    return or_(*(col.startswith(term, autoescape=True) for col in fields.keys), *_id_match(fields, term))
+
+
+def search_condition(fields: SearchFields, term: str):
+    conditions = [col.icontains(term, autoescape=True) for col in fields.text + fields.keys]
+    return or_(*conditions, *_id_match(fields, term))
+
+
+def search_rank(fields: SearchFields, term: str):
+    exact = [col == term for col in fields.keys] + _id_match(fields, term)
+    similarity = func.greatest(*(func.similarity(col, term) for col in fields.text + fields.keys))
+    # rounded to numeric so the value survives a round trip through a cursor
+    rank = [SortKey(func.round(cast(similarity, Numeric), 4, type_=Numeric), desc=True)]
+    if not exact:
+        return rank
+    return [SortKey(case((or_(*exact), 0), else_=1))] + rank
+
+
+async def apply_search(db, query, fields: SearchFields, search: Optional[str]):
+    # returns the filtered query and the rank sort keys (empty without a search term);
+    # an identifier-like term costs one LIMIT 1 probe on the prefix indexes first
+    term = (search or "").strip()
+    if not term:
+        return query, []
+    condition = prefix_condition(fields, term)
+    if condition is None or not await db.scalar(select(query.filter(condition).exists())):
+        condition = search_condition(fields, term)
+    return query.filter(condition), search_rank(fields, term)
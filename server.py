@@ -0,0 +1,139 @@
+# Production launcher: several worker processes with uvloop + httptools.
+#
+#   python server.py                        # uvicorn, one worker per CPU
+#   SERVER=gunicorn python server.py        # gunicorn master, app preloaded and forked into uvicorn workers
+#   python server.py --measure-startup      # import/startup timings, no server
+#
+# Settings (env): HOST, PORT, WEB_CONCURRENCY (workers, default: CPU count),
+# SERVER (uvicorn | gunicorn), PRELOAD (gunicorn only, default on: import the app
+# once in the master so each worker is a cheap fork; off: every worker imports
+# it itself), GRACEFUL_TIMEOUT (seconds in-flight requests get to finish on
+# SIGTERM before the DB pools are closed by the app's lifespan), KEEPALIVE.
+#
+# Nothing heavy is imported here: uvicorn workers import "main:app" themselves,
+# and the gunicorn master only imports it when PRELOAD is on.
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1
+SERVER = os.getenv("SERVER", "uvicorn")
+PRELOAD = os.getenv("PRELOAD", "1").strip().lower() in ("1", "true", "yes", "on")
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+
+
+def run_uvicorn():
+    import uvicorn
+
+    uvicorn.run(
+        "main:app", host=HOST, port=PORT, workers=WEB_CONCURRENCY,
+        loop="uvloop", http="httptools", lifespan="on", proxy_headers=True,
+        timeout_keep_alive=KEEPALIVE, timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        access_log=False,
+    )
+
+
+def post_fork(server, worker):
+    # connections opened in the master must not be shared with the children
+    import database
+
+    database.engine.dispose(close=False)
+    database.async_engine.sync_engine.dispose(close=False)
+
+
+def run_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                "bind": f"{HOST}:{PORT}",
+                "workers": WEB_CONCURRENCY,
+                "worker_class": "uvicorn.workers.UvicornWorker",  # picks uvloop/httptools when installed
+                "preload_app": PRELOAD,
+                "graceful_timeout": GRACEFUL_TIMEOUT,
+                "keepalive": KEEPALIVE,
+                "post_fork": post_fork,
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from main import app
+            return app
+
+    Application().run()
+
+
+def import_times():
+    # a fresh interpreter, so the numbers are what a spawned worker pays
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times, children = [], []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if not match:
+            continue
+        ms, depth, module = int(match.group(1)) / 1000, len(match.group(2)), match.group(3)
+        # entries are listed children first: collect the direct imports until their parent shows up
+        if depth == 2:
+            children.append((ms, module))
+        elif depth == 0:
+            if module == "main":
+                times = [(ms, module)] + children
+            children = []
+    return times
+
+
+async def lifespan_time(app):
+    from database import ping
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter() - started
+        await ping()
+        first_query = time.perf_counter() - started
+    return ready, first_query, time.perf_counter() - started
+
+
+def measure_startup():
+    times = import_times()
+    print("import (fresh interpreter, cumulative ms):")
+    for ms, module in sorted(times, reverse=True)[:15]:
+        print(f"  {module:<24}{ms:9.1f}")
+
+    started = time.perf_counter()
+    from main import app
+    imported = time.perf_counter() - started
+    ready, first_query, stopped = asyncio.run(lifespan_time(app))
+    print(f"import main       {imported * 1000:9.1f} ms")
+    print(f"lifespan startup  {ready * 1000:9.1f} ms")
+    print(f"first DB query    {(first_query - ready) * 1000:9.1f} ms")
+    print(f"shutdown + drain  {(stopped - first_query) * 1000:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with production settings")
+    parser.add_argument("--measure-startup", action="store_true", help="print import and startup timings and exit")
+    args = parser.parse_args()
+
+    if args.measure_startup:
+        measure_startup()
+    elif SERVER == "gunicorn":
+        run_gunicorn()
+    else:
+        run_uvicorn()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# Single-flight coalescing for hot GET routes (dashboard refreshes).
+#
+# Identical concurrent requests (same path, same query parameters in any order,
+# and the same request headers the response depends on) share one execution:
+# the first one runs the app, the others wait for its response and get a copy
+# of the same status, headers and body. So N clients refreshing
+# /suspended_employees?company_type=sales at once cost one ETag check, one page
+# query and one serialization. With SINGLEFLIGHT_WINDOW_MS > 0 a finished 2xx
+# response also answers identical requests arriving within that window.
+#
+# Only the paths passed in are coalesced (JSON routes, never streaming exports).
+# Counted in /metrics as http_coalesced_requests_total{role=leader|follower|window}
+# and the collapse ratio per route.
+import asyncio
+import os
+import time
+from urllib.parse import parse_qsl
+
+import metrics
+from database import PRIMARY_COOKIE
+
+SINGLEFLIGHT_WINDOW_MS = float(os.getenv("SINGLEFLIGHT_WINDOW_MS", "0"))
+
+# the response can differ on these (If-None-Match -> 304, Origin -> CORS headers)
+VARY_HEADERS = (b"if-none-match", b"origin")
+
+
+def request_key(scope):
+    query = sorted(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True))
+    headers = dict(scope["headers"])
+    vary = tuple(headers.get(name) for name in VARY_HEADERS)
+    # reads pinned to the primary after a write (database.py) are not shared with replica reads
+    pinned = PRIMARY_COOKIE.encode() + b"=" in headers.get(b"cookie", b"")
+    return scope["method"], scope["path"], tuple(query), vary, pinned
+
+
+class _Flight:
+    def __init__(self):
+        self.done = asyncio.get_running_loop().create_future()
+        self.route = None
+        self.expires_at = None
+
+
+class SingleFlightMiddleware:
+    def __init__(self, app, paths=(), window_ms=SINGLEFLIGHT_WINDOW_MS):
+        self.app = app
+        self.paths = set(paths)
+        self.window = window_ms / 1000
+        self._flights = {}
+        self._leaders = set()  # strong references: the loop only keeps weak ones to running tasks
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or scope["path"] not in self.paths:
+            return await self.app(scope, receive, send)
+
+        key = request_key(scope)
+        flight = self._flights.get(key)
+        if flight is not None and flight.expires_at is not None and flight.expires_at < time.monotonic():
+            flight = None
+        if flight is None:
+            role = "leader"
+            flight = self._flights[key] = _Flight()
+            # its own task, so a leader whose client goes away still answers the followers
+            task = asyncio.create_task(self._lead(key, flight, scope, receive))
+            self._leaders.add(task)
+            task.add_done_callback(self._leaders.discard)
+        else:
+            role = "window" if flight.done.done() else "follower"
+
+        status, headers, body = await asyncio.shield(flight.done)
+        if flight.route is not None:
+            scope["route"] = flight.route  # for the per-route labels in metrics.py
+        metrics.coalesced_requests.inc((flight.route.path if flight.route else scope["path"], role))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lead(self, key, flight, scope, receive):
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        scope = dict(scope)
+        try:
+            await self.app(scope, receive, capture)
+            flight.route = scope.get("route")
+            flight.done.set_result((start["status"], list(start.get("headers", [])), b"".join(chunks)))
+        except BaseException as e:
+            flight.done.set_exception(e)
+            flight.done.exception()  # marked retrieved: the waiters re-raise it, and there may be none left
+            self._land(key, flight)
+            if not isinstance(e, Exception):
+                raise
+            return
+        if self.window and 200 <= start["status"] < 300:
+            flight.expires_at = time.monotonic() + self.window
+            asyncio.get_running_loop().call_later(self.window, self._land, key, flight)
+        else:
+            self._land(key, flight)
+
+    def _land(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,131 @@
+# Dashboard counts (/stats) served from materialized summaries.
+#
+# The views are created by migration 0003 (suspensions per company, per day
+# and per service provider; per company type is summed from the per-company
+# view, which has one row per company). They are refreshed in the background:
+# every STATS_REFRESH_SECONDS, or soon after a write to the suspension tables
+# (endpoints call stats_refresher.changed()), but never more often than every
+# STATS_MIN_INTERVAL_SECONDS: under a steady stream of writes (the nightly sync)
+# the changes inside that window share one refresh instead of running
+# REFRESH MATERIALIZED VIEW back to back. A refresh only runs when the
+# source tables' change versions (table_versions, see models.py) have moved
+# since the last one, so writes from other workers or scripts are picked up
+# too. The versions used for the last refresh are stored under "suspension_stats"
+# in table_versions, which also makes the /stats ETag change with the data.
+import asyncio
+import logging
+import os
+
+from sqlalchemy import func, select, text
+
+import models
+from conditional import table_versions
+from database import AsyncSessionLocal, async_engine
+
+STATS_REFRESH_SECONDS = float(os.getenv("STATS_REFRESH_SECONDS", "30"))
+STATS_MIN_INTERVAL_SECONDS = float(os.getenv("STATS_MIN_INTERVAL_SECONDS", str(STATS_REFRESH_SECONDS / 6)))
+STATS_DEBOUNCE_SECONDS = 1.0  # a burst of writes triggers one refresh
+
+STATS_VERSION = "suspension_stats"
+SOURCE_TABLES = ["suspended_employees", "suspended_beneficiaries", "company_employees", "companies",
+                 "employee_service_provider", "service_providers"]
+VIEWS = ["stats_suspended_employees_by_company", "stats_suspensions_by_day", "stats_suspended_employees_by_provider"]
+
+log = logging.getLogger("stats")
+
+
+async def refresh_if_changed(db):
+    # only one worker refreshes at a time; the others see the new version afterwards
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(func.hashtext(STATS_VERSION)))):
+        return False
+    versions = await table_versions(db, SOURCE_TABLES + [STATS_VERSION])
+    # versions only ever grow, so their sum changes whenever any source table does
+    source = sum(versions.get(table, 0) for table in SOURCE_TABLES)
+    if source == versions.get(STATS_VERSION):
+        return False
+    for view in VIEWS:
+        await db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+    await db.merge(models.TableVersion(table_name=STATS_VERSION, version=source))
+    await db.commit()
+    return True
+
+
+class StatsRefresher:
+    def __init__(self, interval=STATS_REFRESH_SECONDS, min_interval=STATS_MIN_INTERVAL_SECONDS):
+        self.interval = interval
+        self.min_interval = min_interval
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def changed(self):
+        self._wake.set()
+
+    def start(self):
+        if async_engine.dialect.name == "postgresql" and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                async with AsyncSessionLocal() as db:
+                    if await refresh_if_changed(db):
+                        log.info("suspension stats refreshed")
+            except Exception:
+                log.exception("suspension stats refresh failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+                await asyncio.sleep(max(STATS_DEBOUNCE_SECONDS, started + self.min_interval - loop.time()))
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+
+stats_refresher = StatsRefresher()
+
+
+async def read_stats(db, since=None, until=None):
+    by_company = (await db.execute(text(
+        "SELECT company_id, company_name, company_type, suspended FROM stats_suspended_employees_by_company "
+        "ORDER BY suspended DESC, company_id"
+    ))).mappings().all()
+
+    by_type = {}
+    for row in by_company:
+        by_type[row["company_type"]] = by_type.get(row["company_type"], 0) + row["suspended"]
+
+    days = "SELECT day, employees, beneficiaries FROM stats_suspensions_by_day WHERE 1 = 1"
+    if since is not None:
+        days += " AND day >= :since"
+    if until is not None:
+        days += " AND day <= :until"
+    by_day = (await db.execute(text(days + " ORDER BY day"), {"since": since, "until": until})).mappings().all()
+
+    totals = (await db.execute(text(
+        "SELECT coalesce(sum(employees), 0) AS employees, coalesce(sum(beneficiaries), 0) AS beneficiaries "
+        "FROM stats_suspensions_by_day"
+    ))).mappings().one()
+
+    by_provider = (await db.execute(text(
+        "SELECT provider_id, provider_name, suspended FROM stats_suspended_employees_by_provider "
+        "ORDER BY suspended DESC, provider_id"
+    ))).mappings().all()
+
+    return {
+        "suspended_employees": totals["employees"],
+        "suspended_beneficiaries": totals["beneficiaries"],
+        "by_company_type": [
+            {"company_type": company_type.value, "suspended": by_type.get(company_type.value, 0)}
+            for company_type in models.CompanyTypeEnum
+        ],
+        "by_company": by_company,
+        "by_day": by_day,
+        "by_service_provider": by_provider,
+    }
@@ -0,0 +1,147 @@
+# In-process index of suspended national IDs for GET /suspensions/check.
+#
+# Two sets (suspended employees, suspended beneficiaries) answer the check
+# without touching the database. The index is built from the DB when the app
+# starts and then follows inserts by id: a sync reads the suspension rows from
+# SUSPENSION_INDEX_LOOKBACK_IDS below the highest id seen, because ids are
+# handed out at insert time and a transaction can commit after one holding a
+# higher id has already been synced. The create endpoints sync right after
+# their commit, so a suspension is visible as soon as its POST returns; inserts
+# from other workers or scripts are picked up by a poll of table_versions (see
+# models.py) every SUSPENSION_INDEX_POLL_SECONDS. Only an UPDATE, DELETE or
+# TRUNCATE of a suspension table (its "<table>:rewrite" version, migration
+# 0006) or the timer, every SUSPENSION_INDEX_REBUILD_SECONDS, reloads the sets
+# in full; the timer also catches national_id changes and commits later than
+# the lookback. Until the first build finishes, checks fall back to an exact
+# query.
+import asyncio
+import logging
+import os
+
+from sqlalchemy import exists, select
+
+import models
+from conditional import table_versions
+from database import AsyncSessionLocal
+
+SUSPENSION_INDEX_POLL_SECONDS = float(os.getenv("SUSPENSION_INDEX_POLL_SECONDS", "2"))
+SUSPENSION_INDEX_REBUILD_SECONDS = float(os.getenv("SUSPENSION_INDEX_REBUILD_SECONDS", "600"))
+SUSPENSION_INDEX_LOOKBACK_IDS = int(os.getenv("SUSPENSION_INDEX_LOOKBACK_IDS", "1000"))
+
+SUSPENSION_TABLES = ["suspended_employees", "suspended_beneficiaries"]
+REWRITES = [f"{table}:rewrite" for table in SUSPENSION_TABLES]
+
+log = logging.getLogger("suspensions")
+
+
+def _employee_rows(after_id):
+    return (
+        select(models.SuspendedEmployee.id, models.CompanyEmployee.national_id)
+        .join(models.SuspendedEmployee.employee)
+        .filter(models.SuspendedEmployee.id > after_id)
+    )
+
+
+def _beneficiary_rows(after_id):
+    return (
+        select(models.SuspendedBeneficiary.id, models.Beneficiary.national_id)
+        .join(models.SuspendedBeneficiary.beneficiary)
+        .filter(models.SuspendedBeneficiary.id > after_id)
+    )
+
+
+async def exact_check(db, national_id):
+    employee = exists().where(
+        models.SuspendedEmployee.employee_id == models.CompanyEmployee.id,
+        models.CompanyEmployee.national_id == national_id,
+    )
+    beneficiary = exists().where(
+        models.SuspendedBeneficiary.beneficiary_id == models.Beneficiary.id,
+        models.Beneficiary.national_id == national_id,
+    )
+    return tuple((await db.execute(select(employee, beneficiary))).one())
+
+
+class SuspensionIndex:
+    def __init__(self):
+        self.employees = set()
+        self.beneficiaries = set()
+        self.ready = False
+        self._last_ids = (0, 0)
+        self._versions = None
+        self._lock = asyncio.Lock()
+        self._task = None
+
+    def check(self, national_id):
+        # (suspended as employee, suspended as beneficiary)
+        return national_id in self.employees, national_id in self.beneficiaries
+
+    async def rebuild(self, db):
+        async with self._lock:
+            versions = await table_versions(db, SUSPENSION_TABLES + REWRITES)
+            employees, last_employee = await self._read(db, _employee_rows(0))
+            beneficiaries, last_beneficiary = await self._read(db, _beneficiary_rows(0))
+            self.employees, self.beneficiaries = employees, beneficiaries
+            self._last_ids = (last_employee, last_beneficiary)
+            self._versions = versions
+            self.ready = True
+
+    async def sync(self, db):
+        # adds suspensions created since the last build/sync, and late commits within the lookback
+        if not self.ready:
+            return
+        async with self._lock:
+            last_employee, last_beneficiary = self._last_ids
+            employees, last_employee = await self._read(
+                db, _employee_rows(last_employee - SUSPENSION_INDEX_LOOKBACK_IDS), last_employee)
+            beneficiaries, last_beneficiary = await self._read(
+                db, _beneficiary_rows(last_beneficiary - SUSPENSION_INDEX_LOOKBACK_IDS), last_beneficiary)
+            self.employees |= employees
+            self.beneficiaries |= beneficiaries
+            self._last_ids = (last_employee, last_beneficiary)
+
+    async def refresh(self, db, due=False):
+        # one poll: a full rebuild when due or suspension rows were updated or deleted, a sync after inserts.
+        # True when it rebuilt
+        versions = await table_versions(db, SUSPENSION_TABLES + REWRITES)
+        if due or self._versions is None or any(versions.get(key) != self._versions.get(key) for key in REWRITES):
+            await self.rebuild(db)
+            return True
+        if versions != self._versions:
+            await self.sync(db)
+            self._versions = versions
+        return False
+
+    async def _read(self, db, query, last_id=0):
+        national_ids = set()
+        for suspension_id, national_id in await db.execute(query):
+            national_ids.add(national_id)
+            last_id = max(last_id, suspension_id)
+        return national_ids, last_id
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        rebuilt_at = None
+        while True:
+            try:
+                async with AsyncSessionLocal() as db:
+                    due = rebuilt_at is None or loop.time() - rebuilt_at >= SUSPENSION_INDEX_REBUILD_SECONDS
+                    if await self.refresh(db, due):
+                        rebuilt_at = loop.time()
+                        log.debug("suspension index built: %d employees, %d beneficiaries", len(self.employees), len(self.beneficiaries))
+            except Exception:
+                log.exception("suspension index refresh failed")
+            await asyncio.sleep(SUSPENSION_INDEX_POLL_SECONDS)
+
+
+suspension_index = SuspensionIndex()
@@ -0,0 +1,45 @@
+# The app runs on a throwaway SQLite file (the stand-in database.py supports),
+# with the schema created from models.py for every test. Tests that need real
+# Postgres behaviour (plans, partitions) take the `postgres` fixture: an engine
+# on TEST_POSTGRES_URL, a database migrated with `alembic upgrade head`; they
+# are skipped when it is not set.
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+for name in ("ASYNC_DATABASE_URL", "DATABASE_REPLICA_URLS", "GROUP_COMMIT", "CACHE_URL"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import database
+    import main
+    import models
+    from cache import MemoryBackend
+
+    models.Base.metadata.drop_all(database.engine)
+    models.Base.metadata.create_all(database.engine)
+    main.cache.backend = MemoryBackend()
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def postgres():
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import NullPool
+
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(url, poolclass=NullPool)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,26 @@
+# bulk.py: CSV bodies are parsed as CSV, not line by line.
+import database
+import models
+
+CSV_HEADERS = {"content-type": "text/csv"}
+
+
+def names():
+    with database.SessionLocal() as db:
+        return [b.name for b in db.query(models.Beneficiary).order_by(models.Beneficiary.id)]
+
+
+def test_quoted_newline_stays_in_its_field(client):
+    body = 'name,national_id,phone,nationality\n"Line1\nLine2",q1,1,SA\n"say ""hi""",q2,2,SA\r\nplain,q3,3,SA\n'
+    response = client.post("/beneficiaries/bulk", content=body.encode(), headers=CSV_HEADERS)
+    assert response.json()["inserted"] == 3, response.json()
+    assert response.json()["failed"] == 0
+    assert names() == ["Line1\nLine2", 'say "hi"', "plain"]
+
+
+def test_unterminated_quote_is_reported(client):
+    body = 'name,national_id,phone,nationality\nok,q1,1,SA\n"broken,q2,2,SA\nnext,q3,3,SA\n'
+    result = client.post("/beneficiaries/bulk", content=body.encode(), headers=CSV_HEADERS).json()
+    assert result["inserted"] == 1
+    assert result["errors"] == [{"index": 1, "error": "unterminated quoted field"}]
+    assert names() == ["ok"]
@@ -0,0 +1,22 @@
+# cache.py: a cached body is keyed on the table versions behind the response's ETag.
+import asyncio
+
+from cache import Cache, MemoryBackend
+
+
+def test_body_follows_table_versions_without_invalidate():
+    cache = Cache(MemoryBackend())
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return b"%d" % len(loads)
+
+    async def run():
+        first = await cache.get_or_load("companies", "list", load, {"companies": 1})
+        again = await cache.get_or_load("companies", "list", load, {"companies": 1})
+        # written by another worker or plain SQL: no invalidate() here, only a new version
+        changed = await cache.get_or_load("companies", "list", load, {"companies": 2})
+        return first, again, changed
+
+    assert asyncio.run(run()) == (b"1", b"1", b"2")
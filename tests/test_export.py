@@ -0,0 +1,69 @@
+# export.py: a large export streams in constant memory. The app is called directly over
+# ASGI with a `send` that only counts bytes, since TestClient buffers the whole body.
+import asyncio
+import json
+import os
+import tracemalloc
+from datetime import date, timedelta
+
+import database
+import main
+import models
+
+# ~30s by default; EXPORT_TEST_ROWS=1000000 for the full-size run (same budget, ~200MB body)
+EXPORT_TEST_ROWS = int(os.getenv("EXPORT_TEST_ROWS", "100000"))
+PEAK_BUDGET = 8 * 1024 * 1024  # bytes allocated at once while streaming, whatever the row count
+
+
+def seed(rows):
+    beneficiaries = [{"id": i, "name": f"مستفيد {i}", "national_id": f"1{i:09d}", "phone": "0500000000", "nationality": "SA"}
+                     for i in range(1, 1001)]
+    with database.engine.begin() as conn:
+        conn.execute(models.Beneficiary.__table__.insert(), beneficiaries)
+        first, batch = date(2020, 1, 1), 50_000
+        for start in range(0, rows, batch):
+            conn.execute(models.SuspendedBeneficiary.__table__.insert(), [
+                {"beneficiary_id": i % 1000 + 1, "suspended_at": first + timedelta(days=i % 1500)}
+                for i in range(start, min(start + batch, rows))
+            ])
+
+
+async def export(path):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+    received = {"status": None, "bytes": 0, "lines": 0, "last": b""}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            received["bytes"] += len(body)
+            received["lines"] += body.count(b"\n")
+            received["last"] = body or received["last"]
+
+    await main.app(scope, receive, send)
+    return received
+
+
+def test_export_streams_in_constant_memory(client):
+    seed(EXPORT_TEST_ROWS)
+
+    tracemalloc.start()
+    try:
+        received = asyncio.run(export("/suspended_beneficiaries/export"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert received["status"] == 200
+    assert received["lines"] == EXPORT_TEST_ROWS
+    assert json.loads(received["last"].splitlines()[-1])["beneficiary"]["national_id"]
+    assert received["bytes"] > 2 * PEAK_BUDGET
+    assert peak < PEAK_BUDGET
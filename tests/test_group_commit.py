@@ -0,0 +1,46 @@
+# group_commit.py: with GROUP_COMMIT=1 concurrent creates share one batch, and a row that fails
+# only fails its own caller.
+import asyncio
+
+from sqlalchemy.exc import IntegrityError
+
+import database
+import group_commit
+import models
+
+
+def beneficiary(national_id):
+    return {"name": "مستفيد", "national_id": national_id, "phone": "0500000000", "nationality": "SA"}
+
+
+def test_one_bad_row_fails_only_its_own_caller(client, monkeypatch):
+    monkeypatch.setattr(group_commit, "GROUP_COMMIT", True)
+    monkeypatch.setattr(group_commit, "_committers", {})
+    with database.SessionLocal() as db:
+        db.add(models.Beneficiary(**beneficiary("1000000000")))
+        db.commit()
+    batches = []
+    write = group_commit.GroupCommitter._write
+
+    async def counted_write(self, batch):
+        batches.append(len(batch))
+        await write(self, batch)
+
+    monkeypatch.setattr(group_commit.GroupCommitter, "_write", counted_write)
+
+    async def run():
+        national_ids = ["1000000001", "1000000002", "1000000000", "1000000003", "1000000004"]
+        return await asyncio.gather(
+            *(group_commit.create(None, models.Beneficiary, beneficiary(n)) for n in national_ids),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    assert batches == [5]
+    assert isinstance(results[2], IntegrityError)
+    created = [r for i, r in enumerate(results) if i != 2]
+    assert [r.national_id for r in created] == ["1000000001", "1000000002", "1000000003", "1000000004"]
+    assert len({r.id for r in created}) == 4
+    with database.SessionLocal() as db:
+        assert db.query(models.Beneficiary).count() == 5
@@ -0,0 +1,14 @@
+# /health/live never touches the database; it reports what the last readiness probe found.
+import database
+
+
+def test_liveness_reports_the_last_ping_without_one_of_its_own(client, monkeypatch):
+    assert client.get("/health/ready").json() == {"status": "ok", "database": "ok"}
+    assert client.get("/health/live").json() == {"status": "ok", "database": "ok"}
+
+    monkeypatch.setattr(database, "async_engine", None)  # any query from here on fails
+    assert client.get("/health/live").json() == {"status": "ok", "database": "ok"}
+    assert client.get("/health/ready").status_code == 503
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "database": "unreachable"}
@@ -0,0 +1,36 @@
+# loading.py: the SELECT list holds only the columns the response schema reads.
+import re
+
+from sqlalchemy import select
+
+import models
+import schemas
+from loading import load_options
+
+
+def selected_columns(query):
+    sql = str(query.compile())
+    select_list = sql[len("SELECT "):sql.index("\nFROM")]
+    return set(re.findall(r"(\w+\.\w+)", select_list))
+
+
+def test_suspended_employee_selects_schema_columns_only():
+    query = (
+        select(models.SuspendedEmployee)
+        .join(models.SuspendedEmployee.employee)
+        .join(models.CompanyEmployee.company)
+        .options(*load_options(models.SuspendedEmployee, schemas.SuspendedEmployeeOut, joined=[models.CompanyEmployee, models.Company]))
+    )
+    assert selected_columns(query) == {
+        "suspended_employees.id", "suspended_employees.suspended_at", "suspended_employees.employee_id",
+        "company_employees.id", "company_employees.name", "company_employees.national_id",
+        "company_employees.job_number", "company_employees.nationality", "company_employees.phone",
+        "company_employees.company_id",
+        # CompanySimpleOut: not commercial_number, unified_number or type
+        "companies.id", "companies.name",
+    }
+
+
+def test_company_simple_out_selects_id_and_name():
+    query = select(models.Company).options(*load_options(models.Company, schemas.CompanySimpleOut))
+    assert selected_columns(query) == {"companies.id", "companies.name"}
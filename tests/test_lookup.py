@@ -0,0 +1,48 @@
+# lookup.py: which keys a batch lookup can match, and that odd keys are reported missing, not a 500.
+from lookup import int_keys
+
+
+def test_int_keys_take_only_ascii_digits_that_fit_an_integer():
+    assert int_keys(["7", "²", "٣", "1²", "-1", "2147483648", "x", "07"]) == {7: ["7", "07"]}
+
+
+def test_lookup_by_id_reports_non_numeric_keys_missing(client):
+    client.post("/companies", json={"name": "شركة", "commercial_number": "1", "unified_number": "7", "type": "sales"})
+    client.post("/company_employees", json={
+        "name": "موظف", "national_id": "1000000001", "job_number": "J1",
+        "nationality": "SA", "phone": "0500000000", "company_id": 1,
+    })
+
+    response = client.post("/company_employees/lookup", json={"keys": ["1", "²", "99999999999"]})
+
+    assert response.status_code == 200
+    assert list(response.json()["found"]) == ["1"]
+    assert response.json()["missing"] == ["²", "99999999999"]
+
+
+def test_every_spelling_of_an_id_is_answered(client):
+    client.post("/companies", json={"name": "شركة", "commercial_number": "1", "unified_number": "7", "type": "sales"})
+    client.post("/company_employees", json={
+        "name": "موظف", "national_id": "1000000001", "job_number": "J1",
+        "nationality": "SA", "phone": "0500000000", "company_id": 1,
+    })
+
+    response = client.post("/company_employees/lookup", json={"keys": ["1", "01"]}).json()
+
+    assert sorted(response["found"]) == ["01", "1"]
+    assert response["missing"] == []
+
+
+def test_company_lookup_counts_suspended_employees_not_suspensions(client):
+    client.post("/companies", json={"name": "شركة", "commercial_number": "1", "unified_number": "7", "type": "sales"})
+    for i in (1, 2):
+        client.post("/company_employees", json={
+            "name": "موظف", "national_id": f"100000000{i}", "job_number": f"J{i}",
+            "nationality": "SA", "phone": "0500000000", "company_id": 1,
+        })
+    for day in ("2024-01-01", "2024-02-01"):  # employee 1 suspended twice
+        client.post("/suspended_employees", json={"employee_id": 1, "suspended_at": day})
+
+    response = client.post("/companies/lookup", json={"keys": ["7"]}).json()
+
+    assert response["found"]["7"]["suspended_employees"] == 1
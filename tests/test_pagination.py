@@ -0,0 +1,33 @@
+# pagination.py: a cursor only continues the sort it was issued for.
+def test_cursor_is_rejected_under_another_sort(client):
+    client.post("/companies", json={"name": "شركة", "commercial_number": "1", "unified_number": "7", "type": "sales"})
+    for i, name in enumerate(["ب", "أ", "ج"]):
+        client.post("/company_employees", json={
+            "name": name, "national_id": f"100000000{i}", "job_number": f"J{i}",
+            "nationality": "SA", "phone": "0500000000", "company_id": 1,
+        })
+
+    first = client.get("/company_employees", params={"limit": 1, "sort": "name"}).json()
+    cursor = first["next_cursor"]
+
+    following = client.get("/company_employees", params={"limit": 1, "sort": "name", "cursor": cursor})
+    assert following.status_code == 200
+    assert [e["name"] for e in first["data"] + following.json()["data"]] == ["أ", "ب"]
+    for sort in ("-name", "id", None):
+        response = client.get("/company_employees", params={"limit": 1, "sort": sort, "cursor": cursor})
+        assert response.status_code == 400
+
+
+def test_sort_by_company_id_is_named_for_the_column(client):
+    for n in ("1", "2"):
+        client.post("/companies", json={"name": f"شركة {n}", "commercial_number": n, "unified_number": f"7{n}", "type": "sales"})
+    for i, company_id in enumerate([2, 1, 2]):
+        client.post("/company_employees", json={
+            "name": "موظف", "national_id": f"100000000{i}", "job_number": f"J{i}",
+            "nationality": "SA", "phone": "0500000000", "company_id": company_id,
+        })
+
+    assert client.get("/company_employees", params={"sort": "company"}).status_code == 400
+    first = client.get("/company_employees", params={"limit": 2, "sort": "-company_id"}).json()
+    rest = client.get("/company_employees", params={"limit": 2, "sort": "-company_id", "cursor": first["next_cursor"]}).json()
+    assert [e["company_id"] for e in first["data"] + rest["data"]] == [2, 2, 1]
@@ -0,0 +1,54 @@
+# database.py read routing, with two SQLite files standing in for the primary and a replica.
+import os
+
+import pytest
+from sqlalchemy import create_engine
+
+import database
+import models
+
+BENEFICIARY = {"name": "مستفيد", "national_id": "1000000001", "phone": "0500000000", "nationality": "SA"}
+
+
+def use_replica(monkeypatch, url):
+    monkeypatch.setattr(database, "replicas", [database.Replica(url)])
+
+
+@pytest.fixture
+def replica(client, monkeypatch, tmp_path):
+    # the replica has a beneficiary the primary doesn't: a response shows which one answered
+    url = "sqlite:///" + str(tmp_path / "replica.db")
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(models.Beneficiary.__table__.insert(), {**BENEFICIARY, "name": "على النسخة"})
+    engine.dispose()
+    use_replica(monkeypatch, url)
+
+
+def test_reads_go_to_the_replica(client, replica):
+    assert client.get("/beneficiaries/1000000001").json()["name"] == "على النسخة"
+
+    # a batch lookup is a POST that only reads: replica, and the client is not pinned
+    response = client.post("/beneficiaries/lookup", json={"keys": ["1000000001"]})
+    assert list(response.json()["found"]) == ["1000000001"]
+    assert database.PRIMARY_COOKIE not in response.cookies
+
+
+def test_a_write_pins_the_client_to_the_primary(client, replica):
+    response = client.post("/beneficiaries", json={**BENEFICIARY, "national_id": "1000000002"})
+    assert response.status_code == 200
+    assert database.PRIMARY_COOKIE in response.cookies
+
+    # the cookie rides along: the read sees the write, which the replica doesn't have
+    assert client.get("/beneficiaries/1000000002").status_code == 200
+    assert client.get("/beneficiaries/1000000001").status_code == 404
+
+
+def test_reads_fall_back_to_the_primary_when_the_replica_is_down(client, monkeypatch, tmp_path):
+    use_replica(monkeypatch, "sqlite:///" + os.path.join(str(tmp_path), "missing", "replica.db"))
+    client.post("/beneficiaries", json=BENEFICIARY)
+    client.cookies.clear()
+
+    assert client.get("/beneficiaries/1000000001").json()["name"] == "مستفيد"
+    assert database.replicas[0].down_until > 0
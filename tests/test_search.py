@@ -0,0 +1,73 @@
+# search.py: which rows a term matches, and that Postgres answers it from the search indexes.
+import asyncio
+
+import pytest
+from sqlalchemy import select, text
+
+import database
+import models
+from search import EMPLOYEE_SEARCH, SUSPENDED_BENEFICIARY_SEARCH, apply_search, prefix_condition, search_condition, search_rank
+
+
+def employee(client, national_id, job_number, name="موظف"):
+    response = client.post("/company_employees", json={
+        "name": name, "national_id": national_id, "job_number": job_number,
+        "nationality": "SA", "phone": "0500000000", "company_id": 1,
+    })
+    assert response.status_code == 200
+
+
+def matches(term):
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            query, _ = await apply_search(db, select(models.CompanyEmployee.job_number), EMPLOYEE_SEARCH, term)
+            return sorted(await db.scalars(query))
+    return asyncio.run(run())
+
+
+def test_identifier_terms_still_match_substrings_in_any_case(client):
+    client.post("/companies", json={"name": "شركة", "commercial_number": "1", "unified_number": "7", "type": "sales"})
+    employee(client, "1000000001", "J1234")
+    employee(client, "1000000002", "A-123")
+    employee(client, "2123000003", "K9")
+
+    assert matches("j12") == ["J1234"]
+    assert matches("123") == ["A-123", "J1234", "K9"]  # no key starts with it: suffix and middle of a key
+    assert matches("10000000") == ["A-123", "J1234"]
+
+
+def test_a_prefix_hit_narrows_an_identifier_search_to_the_prefix_matches(client):
+    client.post("/companies", json={"name": "شركة", "commercial_number": "1", "unified_number": "7", "type": "sales"})
+    employee(client, "1000000001", "J12")
+    employee(client, "1000000002", "XJ12")
+
+    assert matches("J12") == ["J12"]
+    assert matches("12") == ["J12", "XJ12"]  # no key starts with it: substring match
+
+
+def explain(conn, query):
+    sql = str(query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return "\n".join(conn.scalars(text(f"EXPLAIN {sql}")))
+
+
+def test_search_is_served_by_the_indexes(postgres):
+    with postgres.connect() as conn:
+        if not conn.scalar(text("SELECT count(*) FROM pg_opclass WHERE opcname = 'gin_trgm_ops'")):
+            pytest.skip("pg_trgm is not installed")
+        # a small test table would be scanned whatever the indexes; only ask whether they can serve the search
+        conn.execute(text("SET enable_seqscan = off"))
+        for term, index in [("محمد", "ix_trgm_company_employees_name"), ("1000", "ix_trgm_company_employees_national_id")]:
+            plan = explain(conn, select(models.CompanyEmployee.id).filter(search_condition(EMPLOYEE_SEARCH, term)))
+            assert index in plan
+            assert "Seq Scan" not in plan
+        # the fast path's probe
+        plan = explain(conn, select(models.CompanyEmployee.id).filter(prefix_condition(EMPLOYEE_SEARCH, "1000")))
+        assert "ix_prefix_company_employees_national_id" in plan
+        assert "ix_trgm_" not in plan
+
+
+def test_superscript_digits_are_not_taken_for_an_id():
+    # "²".isdigit() is True but int("²") raises
+    for term in ("²", "1²"):
+        search_condition(SUSPENDED_BENEFICIARY_SEARCH, term)
+        search_rank(SUSPENDED_BENEFICIARY_SEARCH, term)
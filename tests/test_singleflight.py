@@ -0,0 +1,78 @@
+# singleflight.py: identical concurrent GETs run the app once and share its response.
+import asyncio
+from collections import defaultdict
+
+import metrics
+from singleflight import SingleFlightMiddleware
+
+
+class CountingApp:
+    # a slow JSON route that numbers its runs, so a shared response is visible in the body
+    def __init__(self):
+        self.runs = 0
+
+    async def __call__(self, scope, receive, send):
+        self.runs += 1
+        run = self.runs
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"run": %d}' % run})
+
+
+async def get(app, path, query=b"", headers=()):
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query, "headers": list(headers)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def test_identical_gets_run_the_app_once(monkeypatch):
+    monkeypatch.setattr(metrics.coalesced_requests, "series", defaultdict(int))
+    inner = CountingApp()
+    app = SingleFlightMiddleware(inner, paths=["/suspended_employees"])
+
+    async def run():
+        queries = [b"company_type=sales&limit=10", b"limit=10&company_type=sales"] * 3
+        return await asyncio.gather(*(get(app, "/suspended_employees", query) for query in queries))
+
+    responses = asyncio.run(run())
+
+    assert inner.runs == 1
+    assert responses == [(200, b'{"run": 1}')] * 6
+    assert metrics.coalesced_requests.series == {("/suspended_employees", "leader"): 1, ("/suspended_employees", "follower"): 5}
+    rendered = metrics.render({}, {"pool": "NullPool"})
+    assert 'http_coalesced_collapse_ratio{route="/suspended_employees"} 0.8333' in rendered
+
+
+def test_conditional_requests_are_not_merged_with_plain_ones():
+    inner = CountingApp()
+    app = SingleFlightMiddleware(inner, paths=["/companies"])
+
+    async def run():
+        return await asyncio.gather(
+            get(app, "/companies", b"type=sales"),
+            get(app, "/companies", b"type=sales", [(b"if-none-match", b'W/"abc"')]),
+        )
+
+    plain, conditional = asyncio.run(run())
+
+    assert inner.runs == 2
+    assert plain != conditional
+
+
+def test_other_paths_are_not_coalesced():
+    inner = CountingApp()
+    app = SingleFlightMiddleware(inner, paths=["/companies"])
+
+    async def run():
+        return await asyncio.gather(get(app, "/companies/export"), get(app, "/companies/export"))
+
+    asyncio.run(run())
+    assert inner.runs == 2
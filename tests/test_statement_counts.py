@@ -0,0 +1,55 @@
+# The number of SQL statements a list request issues must not grow with the page
+# size: nested relationships are loaded up front (loading.py), never per row.
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+import database
+import models
+
+
+@contextmanager
+def statements():
+    seen = []
+
+    def count(conn, cursor, statement, *args):
+        seen.append(statement)
+
+    engine = database.async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        yield seen
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+
+@pytest.fixture
+def suspensions(client):
+    with database.SessionLocal() as db:
+        companies = [models.Company(name=f"شركة {i}", commercial_number=str(i), unified_number=f"7{i}",
+                                    type=models.CompanyTypeEnum.sales if i % 2 else models.CompanyTypeEnum.installation)
+                     for i in range(10)]
+        employees = [models.CompanyEmployee(name=f"موظف {i}", national_id=f"1{i:09d}", job_number=f"J{i}",
+                                            nationality="SA", phone="0500000000", company=companies[i % 10])
+                     for i in range(150)]
+        db.add_all([models.SuspendedEmployee(employee=employee, suspended_at=date(2024, 1, 1) + timedelta(days=i))
+                    for i, employee in enumerate(employees)])
+        db.commit()
+
+
+@pytest.mark.parametrize("path", [
+    "/suspended_employees?limit={limit}",
+    "/suspended_employees?limit={limit}&company_type=sales",
+    "/suspended_employees?limit={limit}&sort=-suspended_at&total=none",
+])
+def test_statements_do_not_grow_with_page_size(client, suspensions, path):
+    counts = {}
+    for limit in (5, 100):
+        with statements() as seen:
+            response = client.get(path.format(limit=limit))
+        assert response.status_code == 200
+        assert len(response.json()["data"]) == (limit if "sales" not in path else min(limit, 75))
+        counts[limit] = len(seen)
+    assert counts[5] == counts[100], counts
@@ -0,0 +1,79 @@
+# stats.py: the materialized summaries follow the suspension tables, and a steady stream of
+# writes gets at most one refresh per STATS_MIN_INTERVAL_SECONDS.
+import asyncio
+import uuid
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import database
+import stats
+
+
+def test_a_stream_of_changes_is_refreshed_at_most_once_per_min_interval(monkeypatch):
+    refreshed = []
+
+    async def refresh_if_changed(db):
+        refreshed.append(asyncio.get_running_loop().time())
+        return True
+
+    monkeypatch.setattr(stats, "refresh_if_changed", refresh_if_changed)
+    monkeypatch.setattr(stats, "STATS_DEBOUNCE_SECONDS", 0.01)
+    refresher = stats.StatsRefresher(interval=60, min_interval=0.3)
+
+    async def run():
+        task = asyncio.create_task(refresher._run())
+        for _ in range(50):  # a write every 20ms for a second
+            refresher.changed()
+            await asyncio.sleep(0.02)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert 2 <= len(refreshed) <= 5
+    assert all(later - earlier >= 0.29 for earlier, later in zip(refreshed, refreshed[1:]))
+
+
+def test_stats_follow_the_suspension_tables(postgres):
+    tag = uuid.uuid4().hex[:8]
+    engine = create_async_engine(database.to_async_url(postgres.url.render_as_string(hide_password=False)), poolclass=NullPool)
+
+    def suspend(conn, employee_id):
+        conn.execute(text("INSERT INTO suspended_employees (employee_id, suspended_at) VALUES (:id, :day)"),
+                     {"id": employee_id, "day": date(2024, 1, 1)})
+
+    async def refresh_and_read():
+        async with AsyncSession(engine) as db:
+            refreshed = await stats.refresh_if_changed(db)
+        async with AsyncSession(engine) as db:
+            return refreshed, await stats.read_stats(db)
+
+    with postgres.begin() as conn:
+        company_id = conn.scalar(text(
+            "INSERT INTO companies (name, commercial_number, unified_number, type) "
+            "VALUES (:name, :number, :number, 'sales') RETURNING id"), {"name": f"شركة {tag}", "number": tag})
+        employee_id = conn.scalar(text(
+            "INSERT INTO company_employees (name, national_id, job_number, nationality, phone, company_id) "
+            "VALUES ('موظف', :number, :number, 'SA', '0500000000', :company) RETURNING id"), {"number": tag, "company": company_id})
+        suspend(conn, employee_id)
+    try:
+        refreshed, before = asyncio.run(refresh_and_read())
+        assert refreshed
+        assert asyncio.run(refresh_and_read())[0] is False  # nothing changed since
+
+        with postgres.begin() as conn:
+            suspend(conn, employee_id)
+        refreshed, after = asyncio.run(refresh_and_read())
+        assert refreshed
+        assert after["suspended_employees"] == before["suspended_employees"] + 1
+        company = next(row for row in after["by_company"] if row["company_id"] == company_id)
+        assert company["suspended"] == 2
+    finally:
+        with postgres.begin() as conn:
+            conn.execute(text("DELETE FROM suspended_employees WHERE employee_id = :id"), {"id": employee_id})
+            conn.execute(text("DELETE FROM company_employees WHERE id = :id"), {"id": employee_id})
+            conn.execute(text("DELETE FROM companies WHERE id = :id"), {"id": company_id})
+        asyncio.run(refresh_and_read())
+        asyncio.run(engine.dispose())
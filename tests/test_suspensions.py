@@ -0,0 +1,80 @@
+# suspensions.py: the in-memory index follows inserts by id (including ones committed out of id
+# order) and reloads in full only when suspension rows are updated or deleted.
+import asyncio
+from datetime import date
+
+from sqlalchemy import delete
+
+import database
+import models
+from suspensions import SuspensionIndex
+
+
+def suspend(employee_id, suspension_id):
+    with database.SessionLocal() as db:
+        db.add(models.SuspendedEmployee(id=suspension_id, employee_id=employee_id, suspended_at=date(2024, 1, 1)))
+        db.commit()
+
+
+def employees():
+    with database.SessionLocal() as db:
+        company = models.Company(name="شركة", commercial_number="1", unified_number="7", type=models.CompanyTypeEnum.sales)
+        db.add_all([
+            models.CompanyEmployee(id=1, name="أ", national_id="1000000001", job_number="J1", nationality="SA", phone="0500000000", company=company),
+            models.CompanyEmployee(id=2, name="ب", national_id="1000000002", job_number="J2", nationality="SA", phone="0500000000", company=company),
+        ])
+        db.commit()
+
+
+def bump(*keys):
+    # what the triggers do on Postgres (migrations 0001a and 0006)
+    with database.SessionLocal() as db:
+        for key in keys:
+            version = db.get(models.TableVersion, key)
+            db.merge(models.TableVersion(table_name=key, version=(version.version if version else 0) + 1))
+        db.commit()
+
+
+def test_sync_picks_up_a_commit_out_of_id_order(client):
+    employees()
+    index = SuspensionIndex()
+
+    async def sync():
+        async with database.AsyncSessionLocal() as db:
+            await index.sync(db)
+
+    async def run():
+        async with database.AsyncSessionLocal() as db:
+            await index.rebuild(db)
+        suspend(1, 101)  # took id 101 later, committed first
+        await sync()
+        suspend(2, 100)  # took id 100 first, committed after 101 was synced
+        await sync()
+
+    asyncio.run(run())
+    assert index.check("1000000001") == (True, False)
+    assert index.check("1000000002") == (True, False)
+
+
+def test_poll_rebuilds_only_after_updates_or_deletes(client):
+    employees()
+    index = SuspensionIndex()
+
+    async def refresh():
+        async with database.AsyncSessionLocal() as db:
+            return await index.refresh(db)
+
+    assert asyncio.run(refresh())  # the first build
+    assert not asyncio.run(refresh())
+
+    suspend(1, 1)
+    bump("suspended_employees", "company_employees")
+    assert not asyncio.run(refresh())  # an insert: synced by id
+    assert index.check("1000000001") == (True, False)
+
+    with database.SessionLocal() as db:
+        db.execute(delete(models.SuspendedEmployee))
+        db.commit()
+    bump("suspended_employees", "suspended_employees:rewrite")
+    assert asyncio.run(refresh())
+    assert index.check("1000000001") == (False, False)